@@ -3,21 +3,29 @@ Refactored AFK Reconnect Monitor
 Watches for disconnect/reconnect popups and auto-responds
 """
 
-import pytesseract
 import time
 import keyboard
 import logging
 import sys
 from pathlib import Path
+from typing import Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import TESSERACT_PATH, BUTTONS_DIR
+from config import (BUTTONS_DIR, CAPTURE_BUFFER_SLOTS,
+                    PREFILTER_ENABLED, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, PREFILTER_MIN_RATIO,
+                    PROBE_SIGNATURES_FILE, SENTINEL_HZ, SENTINEL_FULL_CHECK_INTERVAL,
+                    SENTINEL_WINDOW_FALLBACK_INTERVAL,
+                    BACKGROUND_CAPTURE, FRAME_CACHE_ENABLED, FRAME_CACHE_ENTRIES, FRAME_CACHE_MODE)
 from windows_manager import RobloxWindowManager
 from input_simulator import InputSimulator
 from button_detector import ButtonDetector, ButtonActions
-import pyautogui
+from screen_capture import ScreenCapture
+from color_prefilter import ColorPrefilter
+from frame_cache import FrameCache
+from probe_sentinel import ProbeSentinel
+from modal_ocr import find_text
 
 # Configure logging
 logging.basicConfig(
@@ -26,9 +34,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Setup Tesseract
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-
 stop_flag = False
 
 def stop_script():
@@ -45,47 +50,169 @@ class AFKMonitor:
     
     def __init__(self):
         self.window_mgr = RobloxWindowManager()
-        self.input = InputSimulator()
-        self.detector = ButtonDetector(BUTTONS_DIR)
+        # With background capture, focus is only taken right before input is sent
+        self.input = InputSimulator(before_input=self._focus_for_input if BACKGROUND_CAPTURE else None)
+        self.capture = ScreenCapture(slots=CAPTURE_BUFFER_SLOTS)
+        self.frame_cache = FrameCache(FRAME_CACHE_ENTRIES, FRAME_CACHE_MODE, enabled=FRAME_CACHE_ENABLED)
+        self.detector = ButtonDetector(BUTTONS_DIR, capture=self.capture, frame_cache=self.frame_cache)
         self.actions = ButtonActions(self.detector, self.input)
+        self.prefilter = ColorPrefilter(BUTTONS_DIR, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS,
+                                        PREFILTER_MIN_RATIO, enabled=PREFILTER_ENABLED)
+        self.sentinel = ProbeSentinel.load(PROBE_SIGNATURES_FILE,
+                                           self.capture if BACKGROUND_CAPTURE else None,
+                                           SENTINEL_WINDOW_FALLBACK_INTERVAL)
     
-    def dismiss_modal_ocr(self) -> bool:
-        """Find and dismiss modal using OCR
+    def _focus_for_input(self) -> None:
+        """Bring Roblox to the foreground before a click or key press
+        
+        Doesn't maximize: click coordinates come from a frame captured at the
+        window's current rect.
+        """
+        hwnd = self.window_mgr.get_roblox_hwnd()
+        if hwnd:
+            self.window_mgr.bring_to_front(hwnd)
+    
+    def capture_window(self):
+        """Capture the Roblox window for this tick
+        
+        Uses a background window capture when BACKGROUND_CAPTURE is on (no focus
+        change, works while covered); otherwise focuses and grabs the desktop.
         
         Returns:
-            True if dismissed
+            (frame, region) or (None, None) if the window is unavailable
         """
-        region = self.window_mgr.get_roblox_region()
+        hwnd = self.window_mgr.get_roblox_hwnd()
+        if not hwnd:
+            return None, None
+        if not BACKGROUND_CAPTURE:
+            # Focusing maximizes, so the region is read afterwards
+            self.window_mgr.focus_roblox(start_if_missing=False)
+        region = self.window_mgr.get_roblox_region(hwnd)
         if not region:
-            return False
+            return None, None
         
-        screenshot = pyautogui.screenshot(region=region)
-        gray = screenshot.convert("L")
-        data = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+        if BACKGROUND_CAPTURE:
+            frame = self.capture.grab_window(hwnd)
+        else:
+            frame = self.capture.grab(region)
+        return frame, region
+    
+    def dismiss_modal_ocr(self, frame=None, region=None, roi=None, gray=None, key=None) -> bool:
+        """Find and dismiss modal using OCR
+        
+        Args:
+            frame: Optional BGRA frame of the Roblox window already captured this tick
+            region: Screen region the frame was captured from (required with frame)
+            roi: Optional (left, top, width, height) within the frame to OCR
+            gray: Grayscale version of frame (converted here when omitted)
+            key: Frame cache key of gray, hashed once per tick (hashed here when omitted)
+        
+        Returns:
+            True if dismissed
+        """
+        if frame is None:
+            frame, region = self.capture_window()
+            if frame is None:
+                return False
         
+        if gray is None:
+            gray = self.capture.gray(frame)
+        roi_left, roi_top = 0, 0
+        if roi:
+            roi_left, roi_top, roi_w, roi_h = roi
+            gray = gray[roi_top:roi_top + roi_h, roi_left:roi_left + roi_w]
+            key = None  # The tick's key names the whole frame, not this crop
         # Look for dismiss button text
-        for i, word in enumerate(data["text"]):
-            if "dismiss" in word.lower():
-                x = data["left"][i] + data["width"][i] // 2 + region[0]
-                y = data["top"][i] + data["height"][i] // 2 + region[1]
-                self.input.wiggle_and_click(x, y)
-                logger.info(f"Dismissed modal at ({x}, {y})")
-                return True
-        
-        return False
+        hit = find_text(gray, "dismiss", cache=self.frame_cache, key=key)
+        if not hit:
+            return False
+        
+        x = hit[0] + region[0] + roi_left
+        y = hit[1] + region[1] + roi_top
+        self.input.wiggle_and_click(x, y)
+        logger.info(f"Dismissed modal at ({x}, {y})")
+        return True
     
-    def try_reconnect(self) -> bool:
+    def try_reconnect(self, frame=None, region=None, gray=None, key=None) -> bool:
         """Attempt to click reconnect button
         
+        The color prefilter narrows the search to an ROI of the frame; the
+        match runs on that ROI of the grayscale frame.
+        
+        Args:
+            frame: Optional BGRA frame of the Roblox window already captured this tick
+            region: Screen region the frame was captured from (required with frame)
+            gray: Grayscale version of frame (converted here when omitted)
+            key: Frame cache key of gray, hashed once per tick (hashed here when omitted)
+        
         Returns:
             True if clicked
         """
-        region = self.window_mgr.get_roblox_region()
-        if not region:
+        if frame is None:
+            frame, region = self.capture_window()
+            if frame is None:
+                return False
+        
+        roi = self.prefilter.candidates("reconnect", frame)
+        if not roi:
+            logger.debug("reconnect rejected by color prefilter")
             return False
         
-        # Try to find and click reconnect button
-        return self.actions.click_button_if_visible("reconnect", region=region)
+        if gray is None:
+            gray = self.capture.gray(frame)
+        return self.actions.click_button_in_frame("reconnect", gray, region[:2], roi=roi, key=key)
+    
+    def check_once(self) -> None:
+        """Full check: capture, OCR for modals, then match reconnect if it passes the prefilter"""
+        frame, region = self.capture_window()
+        if frame is None:
+            logger.warning("Could not capture Roblox window")
+            return
+        gray = self.capture.gray(frame)
+        key = self.frame_cache.key(gray)  # One hash serves every lookup on this frame
+        
+        # Try to dismiss any modal
+        if self.dismiss_modal_ocr(frame, region, gray=gray, key=key):
+            # Screen changed under the click; the next tick sees the new state
+            return
+        
+        # Try to reconnect if needed
+        self.try_reconnect(frame, region, gray, key)
+    
+    def watch_probes(self) -> Optional[str]:
+        """Sample probe pixels at SENTINEL_HZ until a dialog signature matches
+        
+        Returns after SENTINEL_FULL_CHECK_INTERVAL even without a hit, so the
+        full check still runs occasionally as a safety net.
+        
+        Returns:
+            Name of the matched signature, or None on timeout/stop
+        """
+        period = 1.0 / SENTINEL_HZ
+        deadline = time.monotonic() + SENTINEL_FULL_CHECK_INTERVAL
+        hwnd = None
+        region = None
+        window_checked = 0.0
+        
+        while not stop_flag and time.monotonic() < deadline:
+            now = time.monotonic()
+            if hwnd is None or now - window_checked >= 1.0:
+                # Window lookup enumerates processes, so only refresh it once a second
+                hwnd = self.window_mgr.get_roblox_hwnd()
+                region = self.window_mgr.get_roblox_region(hwnd) if hwnd else None
+                window_checked = now
+                if not region:
+                    return None
+            
+            if BACKGROUND_CAPTURE:
+                hit = self.sentinel.check_window(hwnd)
+            else:
+                hit = self.sentinel.check(region)
+            if hit:
+                logger.info(f"Probe signature '{hit}' matched, escalating")
+                return hit
+            time.sleep(max(0.0, period - (time.monotonic() - now)))
+        return None
     
     def run_monitor(self) -> None:
         """Main monitoring loop - watches for disconnect/reconnect events"""
@@ -93,6 +220,9 @@ class AFKMonitor:
         
         logger.info("Starting AFK Monitor")
         logger.info("This will watch for disconnect/reconnect popups")
+        if self.sentinel:
+            logger.info(f"Sentinel mode: probing at {SENTINEL_HZ} Hz, "
+                        f"full check every {SENTINEL_FULL_CHECK_INTERVAL}s")
         
         consecutive_errors = 0
         max_errors = 5
@@ -105,17 +235,17 @@ class AFKMonitor:
                     time.sleep(5)
                     continue
                 
-                # Focus window
-                self.window_mgr.focus_roblox(start_if_missing=False)
-                
-                # Try to dismiss any modal
-                self.dismiss_modal_ocr()
+                if self.sentinel:
+                    # Cheap probes until something looks like a dialog
+                    self.watch_probes()
+                    if stop_flag:
+                        break
                 
-                # Try to reconnect if needed
-                self.try_reconnect()
+                self.check_once()
                 
-                # Check interval
-                time.sleep(2)
+                if not self.sentinel:
+                    # Check interval
+                    time.sleep(2)
                 consecutive_errors = 0
                 
             except Exception as e:
@@ -128,6 +258,11 @@ class AFKMonitor:
                 
                 time.sleep(5)
         
+        self.prefilter.log_report()
+        self.frame_cache.log_report()
+        if self.sentinel:
+            logger.info(f"Sentinel: {self.sentinel.samples_taken} samples, "
+                        f"{self.sentinel.window_fallbacks} full-window fallbacks, hits {self.sentinel.hits}")
         logger.info("Monitor stopped")
 
 
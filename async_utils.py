@@ -0,0 +1,48 @@
+"""
+Asyncio helpers
+Offloads blocking capture/detection/OCR and input calls to shared executors
+so the *_async APIs never block the event loop
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from config import ASYNC_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Capture, detection, OCR and window lookups
+_work_executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="async-work")
+# Input runs on one thread so clicks/keys from concurrent tasks never interleave
+_input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-input")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the shared work executor
+
+    Args:
+        func: Blocking callable
+        *args, **kwargs: Passed to func
+
+    Returns:
+        func's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_work_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_input(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run an input action on the serial input executor
+
+    Args:
+        func: Blocking input callable (click, key press, drag)
+        *args, **kwargs: Passed to func
+
+    Returns:
+        func's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_input_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,98 @@
+"""
+Bot behaviours for the unified runtime
+Ranked clicking, modal dismissal and reconnect as BotRuntime plugins
+"""
+
+import logging
+from typing import Iterable, List
+
+from config import BUTTON_OFFSETS, RUNTIME_BEHAVIOURS, SENTINEL_FULL_CHECK_INTERVAL
+from bot_runtime import Behaviour, TickContext
+from modal_ocr import find_text
+
+logger = logging.getLogger(__name__)
+
+
+class DismissModalBehaviour(Behaviour):
+    """OCR the frame's text regions and click "dismiss"
+
+    With learned probe signatures the OCR only runs on a probe hit, plus a full
+    check every SENTINEL_FULL_CHECK_INTERVAL seconds for dialogs without one;
+    without signatures it OCRs the full frame every tick.
+    """
+
+    name = "modal"
+    priority = 100
+    interval = 1.0
+    budget = 0.5
+
+    full_check_interval = SENTINEL_FULL_CHECK_INTERVAL
+    _last_ocr = float("-inf")
+
+    def tick(self, ctx: TickContext) -> bool:
+        if ctx.runtime.sentinel and ctx.now - self._last_ocr < self.full_check_interval and not ctx.probe():
+            return False
+        self._last_ocr = ctx.now
+
+        hit = find_text(ctx.gray(), "dismiss", cache=ctx.runtime.frame_cache, key=ctx.key())
+        if not hit:
+            return False
+
+        x = ctx.region[0] + hit[0]
+        y = ctx.region[1] + hit[1]
+        ctx.click(x, y)
+        logger.info(f"Dismissed modal at ({x}, {y})")
+        return True
+
+
+class ReconnectBehaviour(Behaviour):
+    """Click reconnect when the disconnect dialog is up"""
+
+    name = "reconnect"
+    priority = 90
+    interval = 2.0
+    budget = 0.05
+
+    def tick(self, ctx: TickContext) -> bool:
+        return ctx.click_button("reconnect")
+
+
+class RankedBehaviour(Behaviour):
+    """Click through fight -> ranked -> refresh, one click per tick"""
+
+    name = "ranked"
+    priority = 10
+    interval = 1.0
+    budget = 0.1
+
+    buttons = ("fight", "ranked", "refresh")
+
+    def tick(self, ctx: TickContext) -> bool:
+        for button in self.buttons:
+            if ctx.click_button(button, offset=BUTTON_OFFSETS.get(button, (0, 0))):
+                return True
+        return False
+
+
+# Plugins each bot contributes to the runtime
+BOT_BEHAVIOURS = {
+    "ranked": (DismissModalBehaviour, RankedBehaviour),
+    "afk": (DismissModalBehaviour, ReconnectBehaviour),
+}
+
+
+def build_behaviours(bots: Iterable[str]) -> List[Behaviour]:
+    """Instantiate the behaviours for a set of bots (shared ones only once)
+
+    Args:
+        bots: Bot names from BOT_BEHAVIOURS (e.g. ["ranked", "afk"])
+
+    Returns:
+        Behaviours with priorities/intervals/budgets from RUNTIME_BEHAVIOURS
+    """
+    classes = []
+    for bot in bots:
+        if bot not in BOT_BEHAVIOURS:
+            raise ValueError(f"Unknown bot: {bot} (choose from {', '.join(BOT_BEHAVIOURS)})")
+        classes.extend(cls for cls in BOT_BEHAVIOURS[bot] if cls not in classes)
+    return [cls(**RUNTIME_BEHAVIOURS.get(cls.name, {})) for cls in classes]
@@ -0,0 +1,202 @@
+"""
+Detector benchmark on synthetic scenes
+Reports precision, recall and per-frame latency for each detection strategy
+against the ground truth from synthetic_scenes.py
+"""
+
+import logging
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import BUTTONS_DIR, IMAGE_CONFIDENCE, TESSERACT_PATH, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, \
+    PREFILTER_MIN_RATIO
+from button_detector import ButtonDetector
+from color_prefilter import ColorPrefilter
+from screen_capture import ScreenCapture
+from synthetic_scenes import Region, Scene, SceneGenerator, load_scenes
+
+logger = logging.getLogger(__name__)
+
+Detection = Tuple[str, Tuple[int, int], float]  # (name, center, score)
+Detector = Callable[[np.ndarray], List[Detection]]
+
+
+def opencv_detector(names: Sequence[str], confidence: float) -> Detector:
+    """Baseline: unmasked full-frame cv2.matchTemplate, best hit per template (what pyautogui does)"""
+    templates = {}
+    for name in names:
+        image = cv2.imread(str(BUTTONS_DIR / f"{name}.png"), cv2.IMREAD_COLOR)
+        if image is not None:
+            templates[name] = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def detect(frame: np.ndarray) -> List[Detection]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+        found = []
+        for name, template in templates.items():
+            result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (x, y) = cv2.minMaxLoc(result)
+            if score >= confidence:
+                found.append((name, (x + template.shape[1] // 2, y + template.shape[0] // 2), float(score)))
+        return found
+    return detect
+
+
+def coarse_fine_detector(names: Sequence[str], confidence: float,
+                         prefilter: Optional[ColorPrefilter] = None) -> Detector:
+    """ButtonDetector.match_frame (coarse-to-fine matching), optionally behind the color prefilter"""
+    capture = ScreenCapture(slots=2)
+    detector = ButtonDetector(BUTTONS_DIR, confidence, capture=capture)
+
+    def detect(frame: np.ndarray) -> List[Detection]:
+        gray = capture.gray(frame)
+        found = []
+        for name in names:
+            left, top = 0, 0
+            search = gray
+            if prefilter is not None:
+                roi = prefilter.candidates(name, frame)
+                if not roi:
+                    continue
+                left, top, width, height = roi
+                search = gray[top:top + height, left:left + width]
+            hit = detector.match_frame(name, search)
+            if hit:
+                (x, y), score = hit
+                found.append((name, (left + x, top + y), score))
+        return found
+    return detect
+
+
+def find_all_detector(names: Sequence[str], confidence: float) -> Detector:
+    """ButtonDetector.find_all (every instance, NMS)"""
+    capture = ScreenCapture(slots=2)
+    detector = ButtonDetector(BUTTONS_DIR, confidence, capture=capture)
+
+    def detect(frame: np.ndarray) -> List[Detection]:
+        gray = capture.gray(frame)
+        found = []
+        for name in names:
+            for (left, top, width, height), score in detector.find_all(name, gray):
+                found.append((name, (left + width // 2, top + height // 2), score))
+        return found
+    return detect
+
+
+def ocr_detector() -> Optional[Detector]:
+    """modal_ocr.find_text for the "dismiss" label (None when Tesseract isn't installed)"""
+    binary = TESSERACT_PATH if Path(TESSERACT_PATH).exists() else shutil.which("tesseract")
+    if not binary:
+        return None
+    try:
+        import pytesseract
+        import modal_ocr
+    except ImportError:
+        return None
+    pytesseract.pytesseract.tesseract_cmd = binary
+
+    def detect(frame: np.ndarray) -> List[Detection]:
+        hit = modal_ocr.find_text(cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY), "dismiss")
+        return [("dismiss", hit, 1.0)] if hit else []
+    return detect
+
+
+def _truth(scene: Scene, include_dismiss: bool) -> List[Tuple[str, Region]]:
+    truth = [(obj.name, obj.box) for obj in scene.objects]
+    if include_dismiss and scene.dismiss_box:
+        truth.append(("dismiss", scene.dismiss_box))
+    return truth
+
+
+def evaluate(detect: Detector, scenes: Sequence[Scene], names: Sequence[str],
+             include_dismiss: bool = False) -> Dict[str, float]:
+    """Run a detector over scenes and score it
+
+    A detection is correct when its center falls inside an unmatched ground
+    truth box with the same name.
+
+    Returns:
+        {"precision", "recall", "tp", "fp", "fn", "latency_p50", "latency_p95"}
+    """
+    tp = fp = fn = 0
+    latencies = []
+    for scene in scenes:
+        truth = [(n, box) for n, box in _truth(scene, include_dismiss) if n in names or n == "dismiss"]
+        started = time.perf_counter()
+        found = detect(scene.frame)
+        latencies.append(time.perf_counter() - started)
+
+        matched = [False] * len(truth)
+        for name, (x, y), _ in sorted(found, key=lambda d: -d[2]):
+            for i, (true_name, (left, top, width, height)) in enumerate(truth):
+                if (not matched[i] and true_name == name and
+                        left <= x < left + width and top <= y < top + height):
+                    matched[i] = True
+                    tp += 1
+                    break
+            else:
+                fp += 1
+        fn += matched.count(False)
+
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 1.0,
+        "tp": tp, "fp": fp, "fn": fn,
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p95": float(np.percentile(latencies, 95)),
+    }
+
+
+def main() -> None:
+    """Benchmark every detector on synthetic scenes
+
+    Usage: python bench_detectors.py [count | scenes_dir] [seed]
+    """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    source = sys.argv[1] if len(sys.argv) > 1 else "50"
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    if Path(source).is_dir():
+        scenes = load_scenes(Path(source))
+        names = sorted({obj.name for scene in scenes for obj in scene.objects})
+    else:
+        generator = SceneGenerator(BUTTONS_DIR, seed=seed)
+        scenes = list(generator.scenes(int(source)))
+        names = sorted(generator.templates)
+    logger.info(f"{len(scenes)} scenes, templates: {', '.join(names)}")
+
+    prefilter = ColorPrefilter(BUTTONS_DIR, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, PREFILTER_MIN_RATIO)
+    detectors = {
+        "opencv_full": opencv_detector(names, IMAGE_CONFIDENCE),
+        "coarse_fine": coarse_fine_detector(names, IMAGE_CONFIDENCE),
+        "prefilter_coarse": coarse_fine_detector(names, IMAGE_CONFIDENCE, prefilter),
+        "find_all": find_all_detector(names, IMAGE_CONFIDENCE),
+    }
+
+    logger.info(f"{'detector':<18} {'precision':>9} {'recall':>7} {'tp':>5} {'fp':>5} {'fn':>5} "
+                f"{'p50 ms':>8} {'p95 ms':>8}")
+    for label, detect in detectors.items():
+        stats = evaluate(detect, scenes, names)
+        logger.info(f"{label:<18} {stats['precision']:>9.3f} {stats['recall']:>7.3f} {stats['tp']:>5} "
+                    f"{stats['fp']:>5} {stats['fn']:>5} {stats['latency_p50'] * 1000:>8.1f} "
+                    f"{stats['latency_p95'] * 1000:>8.1f}")
+
+    ocr = ocr_detector()
+    if ocr is None:
+        logger.info("ocr_dismiss        skipped (Tesseract not installed)")
+    else:
+        modal_scenes = [scene for scene in scenes if scene.dismiss_box]
+        stats = evaluate(ocr, scenes, [], include_dismiss=True)
+        logger.info(f"{'ocr_dismiss':<18} {stats['precision']:>9.3f} {stats['recall']:>7.3f} {stats['tp']:>5} "
+                    f"{stats['fp']:>5} {stats['fn']:>5} {stats['latency_p50'] * 1000:>8.1f} "
+                    f"{stats['latency_p95'] * 1000:>8.1f}  ({len(modal_scenes)} modals)")
+
+
+if __name__ == "__main__":
+    main()
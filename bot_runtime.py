@@ -0,0 +1,408 @@
+"""
+Unified bot runtime
+Hosts bot behaviours (ranked clicks, modal dismissal, reconnect) as plugins on
+one loop that shares a single capture, detection cache and input executor
+"""
+
+import logging
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import (BUTTONS_DIR, CAPTURE_BUFFER_SLOTS, BACKGROUND_CAPTURE, STOP_HOTKEY,
+                    PROBE_SIGNATURES_FILE, SENTINEL_WINDOW_FALLBACK_INTERVAL, PREFILTER_ENABLED, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, PREFILTER_MIN_RATIO,
+                    RUNTIME_MAX_BACKOFF, RUNTIME_REPORT_INTERVAL, FRAME_CACHE_ENABLED, FRAME_CACHE_ENTRIES,
+                    FRAME_CACHE_MODE)
+from button_detector import ButtonDetector
+from color_prefilter import ColorPrefilter
+from frame_cache import FrameCache
+from input_simulator import InputSimulator
+from probe_sentinel import ProbeSentinel
+from screen_capture import ScreenCapture
+from windows_manager import RobloxWindowManager
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+
+def install_stop_hotkey(hotkey: str = STOP_HOTKEY) -> threading.Event:
+    """Register the global stop hotkey
+
+    Args:
+        hotkey: keyboard-style hotkey string
+
+    Returns:
+        Event set when the hotkey is pressed
+    """
+    import keyboard
+
+    stop = threading.Event()
+
+    def on_stop():
+        logger.info("Stop hotkey pressed. Exiting...")
+        stop.set()
+
+    keyboard.add_hotkey(hotkey, on_stop)
+    logger.info(f"Press {hotkey.title()} to stop.")
+    return stop
+
+
+class Behaviour(ABC):
+    """Base class for runtime plugins
+
+    Subclasses set `name` and implement `tick`. Priority, interval and budget
+    default to the class attributes and can be overridden per instance.
+    """
+
+    name = "behaviour"
+    priority = 0  # Higher runs first and preempts lower ones when it sends input
+    interval = 1.0  # Seconds between ticks
+    budget = 0.1  # Seconds of work per tick before the interval backs off
+
+    def __init__(self, priority: Optional[int] = None, interval: Optional[float] = None,
+                 budget: Optional[float] = None):
+        if priority is not None:
+            self.priority = priority
+        if interval is not None:
+            self.interval = interval
+        if budget is not None:
+            self.budget = budget
+
+    @abstractmethod
+    def tick(self, ctx: "TickContext") -> bool:
+        """Inspect the current frame and act on it
+
+        Args:
+            ctx: Shared frame, detection and input for this tick
+
+        Returns:
+            True if input was sent (the frame is stale for lower priorities)
+        """
+
+
+class TickContext:
+    """What behaviours see for one runtime tick: one frame, shared lookups"""
+
+    def __init__(self, runtime: "BotRuntime", frame: np.ndarray, region: Region, now: float):
+        self.runtime = runtime
+        self.frame = frame
+        self.region = region
+        self.now = now
+        self.acted = False
+        self._gray: Optional[np.ndarray] = None
+        self._key: Optional[Tuple[Optional[bytes]]] = None
+        self._probe: Optional[Tuple[Optional[str]]] = None
+        self._hits: Dict[Tuple[str, Optional[float]], Optional[Tuple[Tuple[int, int], float]]] = {}
+
+    def gray(self) -> np.ndarray:
+        """Grayscale frame, converted once per tick"""
+        if self._gray is None:
+            self._gray = self.runtime.capture.gray(self.frame)
+        return self._gray
+
+    def key(self) -> Optional[bytes]:
+        """Frame cache key of the grayscale frame, hashed once per tick"""
+        if self._key is None:
+            self._key = (self.runtime.frame_cache.key(self.gray()),)
+        return self._key[0]
+
+    def probe(self) -> Optional[str]:
+        """Probe-sentinel signature matching this tick's frame, checked once per tick"""
+        if self._probe is None:
+            self._probe = (self.runtime.sentinel.check_frame(self.frame),)
+        return self._probe[0]
+
+    def roi(self, name: str) -> Optional[Region]:
+        """Color-prefilter ROI for a template, or None if it can't be on screen"""
+        return self.runtime.prefilter.candidates(name, self.frame)
+
+    def find(self, name: str, confidence: Optional[float] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """Match a button in this tick's frame (memoised across behaviours)
+
+        Args:
+            name: Button name
+            confidence: Override detector confidence
+
+        Returns:
+            ((x, y) screen center, score) or None
+        """
+        key = (name, confidence)
+        if key not in self._hits:
+            hit = None
+            roi = self.roi(name)
+            if roi:
+                found = self.runtime.detector.match_frame(name, self.gray(), confidence, self.key(), roi)
+                if found:
+                    (x, y), score = found
+                    hit = ((self.region[0] + x, self.region[1] + y), score)
+                    self.runtime.detector.cache[name] = hit[0]
+            self._hits[key] = hit
+        return self._hits[key]
+
+    def click(self, x: int, y: int) -> None:
+        """Click at screen coordinates through the shared input executor"""
+        self.runtime.input.wiggle_and_click(x, y)
+        self.acted = True
+
+    def click_button(self, name: str, offset: Tuple[int, int] = (0, 0),
+                     confidence: Optional[float] = None) -> bool:
+        """Click a button if it's in this tick's frame
+
+        Returns:
+            True if clicked
+        """
+        hit = self.find(name, confidence)
+        if not hit:
+            return False
+        (x, y), score = hit
+        self.click(x + offset[0], y + offset[1])
+        logger.info(f"Clicked {name} at ({x + offset[0]}, {y + offset[1]}) (score {score:.2f})")
+        return True
+
+
+@dataclass
+class BehaviourState:
+    """Scheduling state and timing stats for one behaviour"""
+    behaviour: Behaviour
+    next_due: float = 0.0
+    backoff: float = 1.0  # Interval multiplier while over budget
+    ticks: int = 0
+    actions: int = 0
+    preempted: int = 0
+    overruns: int = 0
+    errors: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=256))
+
+
+class BotRuntime:
+    """Runs behaviours by priority against one shared capture per tick"""
+
+    def __init__(self, behaviours: Iterable[Behaviour] = (),
+                 window_mgr: Optional[RobloxWindowManager] = None,
+                 capture: Optional[ScreenCapture] = None,
+                 detector: Optional[ButtonDetector] = None,
+                 prefilter: Optional[ColorPrefilter] = None,
+                 input_sim: Optional[InputSimulator] = None,
+                 background: bool = BACKGROUND_CAPTURE,
+                 max_backoff: float = RUNTIME_MAX_BACKOFF):
+        """Initialize runtime
+
+        Args:
+            behaviours: Plugins to run
+            window_mgr: Window manager (lookup, region, focus)
+            capture: Shared capture (one frame per tick for every behaviour)
+            detector: Shared detector (templates and location cache); gets the runtime's
+                frame cache when it has none
+            prefilter: Shared color prefilter
+            input_sim: Shared input executor
+            background: Capture the window in the background and focus only before input
+            max_backoff: Cap on the interval multiplier for behaviours over budget
+        """
+        self.window_mgr = window_mgr or RobloxWindowManager()
+        self.capture = capture or ScreenCapture(slots=CAPTURE_BUFFER_SLOTS)
+        self.detector = detector or ButtonDetector(BUTTONS_DIR, capture=self.capture)
+        if self.detector.frame_cache is None:
+            self.detector.frame_cache = FrameCache(FRAME_CACHE_ENTRIES, FRAME_CACHE_MODE,
+                                                   enabled=FRAME_CACHE_ENABLED)
+        self.frame_cache = self.detector.frame_cache
+        self.prefilter = prefilter or ColorPrefilter(BUTTONS_DIR, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS,
+                                                     PREFILTER_MIN_RATIO, enabled=PREFILTER_ENABLED)
+        self.sentinel = ProbeSentinel.load(PROBE_SIGNATURES_FILE, self.capture,
+                                           SENTINEL_WINDOW_FALLBACK_INTERVAL)
+        self.background = background
+        self.input = input_sim or InputSimulator(before_input=self._focus_for_input if background else None)
+        self.max_backoff = max_backoff
+        self.states: List[BehaviourState] = []
+        self.frames = 0
+        self._hwnd: Optional[int] = None
+        for behaviour in behaviours:
+            self.register(behaviour)
+
+    def register(self, behaviour: Behaviour) -> None:
+        """Add a behaviour plugin"""
+        self.states.append(BehaviourState(behaviour, next_due=time.monotonic()))
+        self.states.sort(key=lambda s: -s.behaviour.priority)
+        logger.info(f"Registered {behaviour.name} (priority {behaviour.priority}, "
+                    f"every {behaviour.interval}s, budget {behaviour.budget * 1000:.0f}ms)")
+
+    def _focus_for_input(self) -> None:
+        """Bring the captured window to the foreground before input
+
+        Doesn't maximize: click coordinates come from a frame captured at the
+        window's current rect.
+        """
+        if self._hwnd:
+            self.window_mgr.bring_to_front(self._hwnd)
+
+    def capture_window(self) -> Tuple[Optional[np.ndarray], Optional[Region]]:
+        """Capture the Roblox window once for this tick
+
+        Returns:
+            (frame, region) or (None, None) if the window is unavailable
+        """
+        hwnd = self.window_mgr.get_roblox_hwnd()
+        region = self.window_mgr.get_roblox_region(hwnd) if hwnd else None
+        if not region:
+            return None, None
+        self._hwnd = hwnd
+        if self.background:
+            frame = self.capture.grab_window(hwnd)
+        else:
+            frame = self.capture.grab(region)
+        if frame is not None:
+            self.frames += 1
+        return frame, region
+
+    def due(self, now: float) -> List[BehaviourState]:
+        """Behaviours whose tick is due, highest priority first"""
+        return [s for s in self.states if s.next_due <= now]
+
+    def tick(self, now: Optional[float] = None) -> Optional[str]:
+        """Capture once and run every due behaviour in priority order
+
+        Args:
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            Name of the behaviour that sent input, or None
+        """
+        now = time.monotonic() if now is None else now
+        due = self.due(now)
+        if not due:
+            return None
+
+        frame, region = self.capture_window()
+        if frame is None:
+            for state in due:
+                state.next_due = now + state.behaviour.interval
+            return None
+
+        ctx = TickContext(self, frame, region, now)
+        for index, state in enumerate(due):
+            behaviour = state.behaviour
+            started = time.monotonic()
+            try:
+                behaviour.tick(ctx)
+            except Exception as e:
+                state.errors += 1
+                logger.error(f"{behaviour.name} tick failed: {e}", exc_info=True)
+            elapsed = time.monotonic() - started
+            state.ticks += 1
+            state.latencies.append(elapsed)
+
+            # Over budget -> poll less often; back under -> recover gradually
+            if elapsed > behaviour.budget:
+                state.overruns += 1
+                state.backoff = min(self.max_backoff, state.backoff * 2)
+                logger.debug(f"{behaviour.name} took {elapsed * 1000:.0f}ms "
+                             f"(budget {behaviour.budget * 1000:.0f}ms), backoff x{state.backoff:g}")
+            else:
+                state.backoff = max(1.0, state.backoff / 2)
+            state.next_due = now + behaviour.interval * state.backoff
+
+            if ctx.acted:
+                state.actions += 1
+                # The screen is changing under the click; lower priorities retry on a fresh frame
+                for skipped in due[index + 1:]:
+                    skipped.preempted += 1
+                return behaviour.name
+        return None
+
+    def run(self, should_stop, report_interval: float = RUNTIME_REPORT_INTERVAL) -> None:
+        """Tick until `should_stop()` returns True
+
+        Args:
+            should_stop: Polled between ticks
+            report_interval: Seconds between per-behaviour timing reports
+        """
+        logger.info(f"Runtime started with {len(self.states)} behaviours")
+        last_report = time.monotonic()
+        consecutive_errors = 0
+
+        while not should_stop():
+            try:
+                if not self.window_mgr.is_roblox_running():
+                    logger.warning("Roblox not running, waiting...")
+                    time.sleep(5)
+                    continue
+                self.tick()
+                consecutive_errors = 0
+            except Exception as e:
+                logger.error(f"Error in runtime loop: {e}", exc_info=True)
+                consecutive_errors += 1
+                if consecutive_errors >= 5:
+                    logger.error("Too many errors, exiting")
+                    break
+                time.sleep(2)
+
+            now = time.monotonic()
+            if now - last_report >= report_interval:
+                self.log_report()
+                last_report = now
+
+            # Sleep until the next behaviour is due (bounded so stop stays responsive)
+            wake = min((s.next_due for s in self.states), default=now + 0.1)
+            time.sleep(min(0.1, max(0.0, wake - time.monotonic())))
+
+        self.log_report()
+        self.prefilter.log_report()
+        self.frame_cache.log_report()
+        logger.info("Runtime stopped")
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-behaviour tick counts, preemptions and latency percentiles"""
+        report = {}
+        for state in self.states:
+            latencies = np.array(state.latencies) if state.latencies else np.zeros(1)
+            report[state.behaviour.name] = {
+                "ticks": state.ticks,
+                "actions": state.actions,
+                "preempted": state.preempted,
+                "overruns": state.overruns,
+                "errors": state.errors,
+                "backoff": state.backoff,
+                "latency_p50": float(np.percentile(latencies, 50)),
+                "latency_p95": float(np.percentile(latencies, 95)),
+            }
+        return report
+
+    def log_report(self) -> None:
+        """Log per-behaviour timing"""
+        logger.info(f"Runtime: {self.frames} frames captured, {len(self.detector.cache)} cached locations")
+        for name, stats in self.report().items():
+            logger.info(f"{name}: {stats['ticks']} ticks, {stats['actions']} actions, "
+                        f"{stats['preempted']} preempted, {stats['overruns']} over budget, "
+                        f"latency p50 {stats['latency_p50'] * 1000:.0f}ms / p95 "
+                        f"{stats['latency_p95'] * 1000:.0f}ms")
+
+
+def main() -> None:
+    """Run the selected behaviours on one runtime
+
+    Usage: python bot_runtime.py [ranked] [afk]   (default: both)
+    """
+    from behaviours import build_behaviours
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    bots = sys.argv[1:] or ["ranked", "afk"]
+    stop = install_stop_hotkey()
+
+    runtime = BotRuntime(build_behaviours(bots))
+    if not runtime.window_mgr.focus_roblox():
+        logger.error("Cannot start: Roblox not found")
+        return
+    runtime.run(stop.is_set)
+
+
+if __name__ == "__main__":
+    main()
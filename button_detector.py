@@ -3,29 +3,353 @@ Button detection and clicking utility
 Simplifies button detection with configuration-driven approach
 """
 
-import pyautogui
+import asyncio
 import os
+import json
 import logging
-from typing import Optional, Tuple, Callable
+import threading
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple, Callable
 from pathlib import Path
 from PIL import Image
+import cv2
+import numpy as np
+
+import template_matcher
+from async_utils import run_blocking
+from button_layout import ButtonLayout
+from config import THRESHOLDS_FILE
+from frame_cache import FrameCache
+from screen_capture import ScreenCapture
+from template_matcher import Template
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class FrameMatch:
+    """A button found by wait_for/wait_for_any"""
+    name: str
+    location: Tuple[int, int]  # Center in frame coordinates
+    score: float
+    source: object  # Region (grab) or window handle (grab_window) the frame came from
+
+
+class _FrameWaiter:
+    """Frame subscriber that checks each target once per frame until one matches"""
+
+    def __init__(self, detector: "ButtonDetector", names: Sequence[str], confidence: Optional[float],
+                 on_match: Callable[[FrameMatch], None]):
+        self.detector = detector
+        self.names = list(names)
+        self.confidence = confidence
+        self.on_match = on_match
+        self.frames = 0
+        self.done = False
+
+    def __call__(self, frame: np.ndarray, source: object) -> None:
+        if self.done:
+            return
+        self.frames += 1
+        gray = self.detector._gray_frame(frame)  # One conversion and one hash for all targets
+        cache = self.detector.frame_cache
+        key = cache.key(gray) if cache is not None else None
+        for name in self.names:
+            hit = self.detector.match_frame(name, gray, self.confidence, key=key)
+            if hit:
+                self.done = True
+                self.on_match(FrameMatch(name, hit[0], hit[1], source))
+                return
+
+
 class ButtonDetector:
     """Handles image-based button detection and clicking"""
     
-    def __init__(self, buttons_dir: Path, confidence: float = 0.8):
+    def __init__(self, buttons_dir: Path, confidence: float = 0.8,
+                 layout: Optional[ButtonLayout] = None, capture: Optional[ScreenCapture] = None,
+                 auto_mask: bool = False, coarse_stride: int = 3,
+                 thresholds_file: Optional[Path] = None, frame_cache: Optional[FrameCache] = None):
         """Initialize button detector
         
         Args:
             buttons_dir: Directory containing button PNG templates
             confidence: Default confidence threshold for detection
+            layout: Optional layout model used to predict buttons from a known anchor
+            capture: Optional ScreenCapture; enables masked coarse-to-fine matching on
+                captured frames instead of pyautogui's full-rectangle search
+            auto_mask: Generate a foreground mask for templates without alpha
+            coarse_stride: Downscale factor of the coarse pass
+            thresholds_file: Calibrated per-button confidence/stride (defaults to
+                buttons_dir/thresholds.json; `confidence`/`coarse_stride` apply to
+                buttons it doesn't cover)
+            frame_cache: Optional per-frame result cache for match_frame/find_all
         """
         self.buttons_dir = Path(buttons_dir)
         self.confidence = confidence
+        self.layout = layout
+        self.capture = capture
+        self.auto_mask = auto_mask
+        self.coarse_stride = coarse_stride
+        self.templates = {}  # Loaded Template objects
         self.cache = {}  # Cache button locations
+        self.thresholds_file = Path(thresholds_file) if thresholds_file else self.buttons_dir / THRESHOLDS_FILE
+        self.thresholds = self.load_thresholds(self.thresholds_file)
+        self.frame_cache = frame_cache
+    
+    @staticmethod
+    def load_thresholds(path: Path) -> dict:
+        """Read calibrated per-button settings
+        
+        Args:
+            path: JSON file written by calibrate_thresholds.py
+            
+        Returns:
+            {button_name: {"confidence": float, "stride": int, ...}} (empty if missing/invalid)
+        """
+        if not path.exists():
+            return {}
+        try:
+            thresholds = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable thresholds file {path}: {e}")
+            return {}
+        logger.info(f"Loaded calibrated thresholds for {len(thresholds)} buttons from {path.name}")
+        return thresholds
+    
+    def confidence_for(self, button_name: str) -> float:
+        """Calibrated confidence for a button, or the detector default"""
+        return self.thresholds.get(button_name, {}).get("confidence", self.confidence)
+    
+    def stride_for(self, button_name: str) -> int:
+        """Calibrated coarse stride for a button, or the detector default"""
+        return self.thresholds.get(button_name, {}).get("stride", self.coarse_stride)
+    
+    def get_template(self, button_name: str) -> Optional[Template]:
+        """Load (once) the masked template for a button
+        
+        Args:
+            button_name: Button name
+            
+        Returns:
+            Template or None if the PNG is missing/unreadable
+        """
+        if button_name not in self.templates:
+            button_path = self.buttons_dir / f"{button_name}.png"
+            template = None
+            if button_path.exists():
+                template = Template.load(button_path, self.auto_mask)
+            if template is not None:
+                logger.debug(f"Loaded template '{button_name}' {template.width}x{template.height}px "
+                             f"({'masked' if template.mask is not None else 'unmasked'})")
+            self.templates[button_name] = template
+        return self.templates[button_name]
+    
+    def match_frame(self, button_name: str, frame: np.ndarray, confidence: Optional[float] = None,
+                    key: Optional[bytes] = None,
+                    roi: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """Find a button in an already-captured frame
+        
+        Args:
+            button_name: Button name
+            frame: BGRA/BGR frame or grayscale array
+            confidence: Override default confidence
+            key: frame_cache.key() of `frame`, computed once per tick by the caller
+                (hashed here when omitted)
+            roi: Optional (left, top, width, height) of `frame` to search
+            
+        Returns:
+            ((x, y) center in frame coordinates, score) or None
+        """
+        template = self.get_template(button_name)
+        if template is None:
+            logger.warning(f"Button template not found: {self.buttons_dir / f'{button_name}.png'}")
+            return None
+        
+        confidence = confidence or self.confidence_for(button_name)
+        stride = self.stride_for(button_name)
+        
+        if roi is not None:
+            roi = tuple(int(v) for v in roi)
+        
+        def compute():
+            if roi is None:
+                return template_matcher.match(self._gray_frame(frame), template, confidence, stride=stride)
+            left, top, width, height = roi
+            hit = template_matcher.match(self._gray_frame(frame[top:top + height, left:left + width]),
+                                         template, confidence, stride=stride)
+            if hit is None:
+                return None
+            (x, y), score = hit
+            return (left + x, top + y), score
+        if self.frame_cache is None:
+            return compute()
+        # The Template object (not just its name) keys the result, so detectors with
+        # other template sets sharing this cache can't serve each other's hits
+        return self.frame_cache.cached(frame, ("button", template, confidence, stride, roi), compute, key)
+    
+    def _gray_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Grayscale view of a captured frame (pooled buffer when a capture is attached)"""
+        if frame.ndim == 3:
+            if frame.shape[2] == 4 and self.capture is not None:
+                return self.capture.gray(frame)
+            code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(frame, code)
+        return frame
+    
+    def find_all(self, button_name: str, frame: np.ndarray, confidence: Optional[float] = None,
+                 max_results: int = 32, iou_threshold: float = 0.3,
+                 key: Optional[bytes] = None) -> List[Tuple[Tuple[int, int, int, int], float]]:
+        """Find every instance of a button in an already-captured frame
+        
+        Args:
+            button_name: Button name
+            frame: BGRA/BGR frame or grayscale array
+            confidence: Override default confidence
+            max_results: Maximum candidates confirmed (and returned)
+            iou_threshold: Overlap above which duplicate boxes are suppressed
+            key: frame_cache.key() of `frame` (hashed here when omitted)
+            
+        Returns:
+            [((left, top, width, height), score), ...] in frame coordinates, best first
+        """
+        template = self.get_template(button_name)
+        if template is None:
+            logger.warning(f"Button template not found: {self.buttons_dir / f'{button_name}.png'}")
+            return []
+        
+        confidence = confidence or self.confidence_for(button_name)
+        stride = self.stride_for(button_name)
+        
+        def compute():
+            return tuple(template_matcher.match_all(self._gray_frame(frame), template, confidence, stride=stride,
+                                                    max_candidates=max_results, iou_threshold=iou_threshold))
+        if self.frame_cache is None:
+            return list(compute())
+        kind = ("find_all", template, confidence, stride, max_results, iou_threshold)
+        return list(self.frame_cache.cached(frame, kind, compute, key))
+    
+    def find_in_frame(self, button_name: str, frame: np.ndarray, origin: Tuple[int, int] = (0, 0),
+                      roi: Optional[Tuple[int, int, int, int]] = None,
+                      confidence: Optional[float] = None,
+                      key: Optional[bytes] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """Find a button in an already-captured frame, using the layout model first
+        
+        Like find_button() without any capture: layout predictions are verified
+        on a crop of `frame`, otherwise `roi` (or the whole frame) is searched.
+        Hits update the location cache and the layout model.
+        
+        Args:
+            button_name: Button name
+            frame: BGRA/BGR frame or grayscale array
+            origin: Screen (x, y) of the frame's top-left pixel
+            roi: Optional (left, top, width, height) in frame coordinates to search
+            confidence: Override default confidence
+            key: frame_cache.key() of `frame`, computed once per tick by the caller
+            
+        Returns:
+            ((x, y) screen center, score) or None
+        """
+        template = self.get_template(button_name)
+        if template is None:
+            logger.warning(f"Button template not found: {self.buttons_dir / f'{button_name}.png'}")
+            return None
+        
+        hit = None
+        if self.layout and button_name in self.layout:
+            hit = self._find_from_layout_in_frame(button_name, frame, origin, template.size, confidence, key)
+        if hit is None:
+            found = self.match_frame(button_name, frame, confidence, key, roi)
+            if found is None:
+                return None
+            (x, y), score = found
+            hit = ((origin[0] + x, origin[1] + y), score)
+            self._record_layout(button_name, hit[0])
+        self.cache[button_name] = hit[0]
+        return hit
+    
+    def _subscribable(self, names: Sequence[str]) -> bool:
+        """Check wait_for prerequisites and preload templates off the capture thread"""
+        if self.capture is None:
+            logger.error("wait_for needs a ButtonDetector with a ScreenCapture")
+            return False
+        for name in names:
+            self.get_template(name)
+        return True
+    
+    def wait_for_any(self, button_names: Iterable[str], timeout: float,
+                     confidence: Optional[float] = None) -> Optional[FrameMatch]:
+        """Block until any of the buttons shows up in a newly captured frame
+        
+        Frames come from whoever drives this detector's capture (runtime loop,
+        supervisor, ...); no extra captures are taken. Every target is checked
+        once per frame, in the given order.
+        
+        Args:
+            button_names: Buttons to wait for (earlier names win ties)
+            timeout: Seconds to wait
+            confidence: Override default confidence
+            
+        Returns:
+            FrameMatch for the first hit, or None at the deadline
+        """
+        names = list(button_names)
+        if not self._subscribable(names):
+            return None
+        
+        matched = threading.Event()
+        result: List[FrameMatch] = []
+        
+        def on_match(found: FrameMatch) -> None:
+            result.append(found)
+            matched.set()
+        
+        waiter = self.capture.subscribe(_FrameWaiter(self, names, confidence, on_match))
+        try:
+            matched.wait(timeout)
+        finally:
+            self.capture.unsubscribe(waiter)
+        
+        if not result:
+            logger.debug(f"None of {names} seen in {waiter.frames} frames within {timeout}s")
+            return None
+        logger.info(f"{result[0].name} appeared after {waiter.frames} frames")
+        return result[0]
+    
+    def wait_for(self, button_name: str, timeout: float,
+                 confidence: Optional[float] = None) -> Optional[FrameMatch]:
+        """Block until a button shows up in a newly captured frame (see wait_for_any)"""
+        return self.wait_for_any([button_name], timeout, confidence)
+    
+    async def wait_for_any_async(self, button_names: Iterable[str], timeout: float,
+                                 confidence: Optional[float] = None) -> Optional[FrameMatch]:
+        """Await any of the buttons in newly captured frames (see wait_for_any)
+        
+        Matching runs on the capturing thread; the result is handed to the
+        event loop, so nothing here blocks or polls.
+        """
+        names = list(button_names)
+        if not self._subscribable(names):
+            return None
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def on_match(found: FrameMatch) -> None:
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(found))
+        
+        waiter = self.capture.subscribe(_FrameWaiter(self, names, confidence, on_match))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.debug(f"None of {names} seen in {waiter.frames} frames within {timeout}s")
+            return None
+        finally:
+            self.capture.unsubscribe(waiter)
+    
+    async def wait_for_async(self, button_name: str, timeout: float,
+                             confidence: Optional[float] = None) -> Optional[FrameMatch]:
+        """Await a button in newly captured frames (see wait_for_any)"""
+        return await self.wait_for_any_async([button_name], timeout, confidence)
     
     def find_button(self, button_name: str, region: Optional[Tuple[int, int, int, int]] = None,
                    confidence: Optional[float] = None, use_cache: bool = False) -> Optional[Tuple[int, int]]:
@@ -51,18 +375,37 @@ class ButtonDetector:
             return None
         
         try:
-            conf = confidence or self.confidence
-            button_img = Image.open(button_path)
-            img_width, img_height = button_img.size
+            conf = confidence or self.confidence_for(button_name)
+            if self.capture is not None and self.get_template(button_name) is not None:
+                img_width, img_height = self.get_template(button_name).size
+            else:
+                button_img = Image.open(button_path)
+                img_width, img_height = button_img.size
             logger.debug(f"Button image '{button_name}' size: {img_width}x{img_height}px")
             
-            # Don't use region parameter - pyautogui has issues with it
-            # Search full screen instead for more reliable detection
-            location = pyautogui.locateCenterOnScreen(
-                str(button_path),
-                confidence=conf
-            )
+            # Predict from a known anchor and verify a small patch first
+            if self.layout and button_name in self.layout:
+                location = self._find_from_layout(button_name, button_path, (img_width, img_height), conf)
+                if location:
+                    self.cache[button_name] = location
+                    logger.info(f"Found {button_name} at {location} (layout)")
+                    return location
+            
+            if self.capture is not None:
+                # Own capture handles regions reliably; default to the whole screen
+                search = region or (0, 0) + self.capture.screen_size()
+                location = self._locate_in_region(button_name, button_path, search, conf)
+            else:
+                # pyautogui needs a display at import time, so only the screen path loads it
+                import pyautogui
+                # Don't use region parameter - pyautogui has issues with it
+                # Search full screen instead for more reliable detection
+                location = pyautogui.locateCenterOnScreen(
+                    str(button_path),
+                    confidence=conf
+                )
             if location:
+                self._record_layout(button_name, location)
                 self.cache[button_name] = location
                 logger.info(f"Found {button_name} at {location}")
                 return location
@@ -73,6 +416,158 @@ class ButtonDetector:
             logger.error(f"Error detecting {button_name}: {e}")
             return None
     
+    def _locate_in_region(self, button_name: str, button_path: Path,
+                          region: Tuple[int, int, int, int], confidence: float) -> Optional[Tuple[int, int]]:
+        """Search one screen region, via captured frames when available
+        
+        Returns:
+            (x, y) screen center or None
+        """
+        if self.capture is not None:
+            frame = self.capture.grab(region)
+            if frame is None:
+                return None
+            hit = self.match_frame(button_name, frame, confidence)
+            if hit is None:
+                return None
+            (x, y), score = hit
+            logger.debug(f"{button_name} matched with score {score:.3f}")
+            return (region[0] + x, region[1] + y)
+        
+        import pyautogui
+        patch = pyautogui.screenshot(region=region)
+        box = pyautogui.locate(str(button_path), patch, confidence=confidence)
+        if not box:
+            return None
+        return (region[0] + box.left + box.width // 2,
+                region[1] + box.top + box.height // 2)
+    
+    def grab_and_match(self, button_name: str, region: Tuple[int, int, int, int],
+                       confidence: Optional[float] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """Capture a screen region and match a button in it
+        
+        Args:
+            button_name: Button name
+            region: (left, top, width, height) to capture
+            confidence: Override default confidence
+            
+        Returns:
+            ((x, y) center in screen coordinates, score) or None
+        """
+        if self.capture is None:
+            logger.error("grab_and_match needs a ButtonDetector with a capture")
+            return None
+        frame = self.capture.grab(region)
+        if frame is None:
+            return None
+        hit = self.match_frame(button_name, frame, confidence)
+        if not hit:
+            return None
+        (x, y), score = hit
+        return (region[0] + x, region[1] + y), score
+    
+    def _with_capture_lock(self, func: Callable, *args):
+        """Run a detection call holding the capture lock (pooled buffers aren't thread-safe)"""
+        if self.capture is None:
+            return func(*args)
+        with self.capture.lock:
+            return func(*args)
+    
+    async def find_button_async(self, button_name: str, region: Optional[Tuple[int, int, int, int]] = None,
+                                confidence: Optional[float] = None,
+                                use_cache: bool = False) -> Optional[Tuple[int, int]]:
+        """find_button() on a worker thread (see async_utils)"""
+        return await run_blocking(self._with_capture_lock, self.find_button, button_name, region,
+                                  confidence, use_cache)
+    
+    async def match_frame_async(self, button_name: str, frame: np.ndarray,
+                                confidence: Optional[float] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """match_frame() on a worker thread (see async_utils)
+        
+        Matches a private copy of `frame`, so a pooled capture buffer can be
+        reused by the caller while the match runs.
+        """
+        return await run_blocking(self._with_capture_lock, self.match_frame, button_name, frame.copy(),
+                                  confidence)
+    
+    async def grab_and_match_async(self, button_name: str, region: Tuple[int, int, int, int],
+                                   confidence: Optional[float] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """grab_and_match() on a worker thread, holding the capture lock across grab and match
+        
+        The pooled frame can't be overwritten by another task's grab before
+        it's matched, and no copy is made.
+        """
+        return await run_blocking(self._with_capture_lock, self.grab_and_match, button_name, region, confidence)
+    
+    def _layout_anchors(self, button_name: str) -> dict:
+        """Cached locations of other buttons in the same layout"""
+        return {name: loc for name, loc in self.cache.items()
+                if name != button_name and name in self.layout}
+    
+    def _record_layout(self, button_name: str, location: Tuple[int, int]) -> None:
+        """Feed a full-search hit into the layout model"""
+        if self.layout and button_name in self.layout:
+            self.layout.record(button_name, location, self._layout_anchors(button_name))
+    
+    def _find_from_layout(self, button_name: str, button_path: Path, size: Tuple[int, int],
+                          confidence: float) -> Optional[Tuple[int, int]]:
+        """Predict a button from cached anchors and verify with a patch check
+        
+        Args:
+            button_name: Button to locate
+            button_path: Template path
+            size: Template (width, height)
+            confidence: Match threshold
+            
+        Returns:
+            (x, y) center or None if no prediction verified
+        """
+        tried = set()
+        for anchor_name, anchor_loc in self._layout_anchors(button_name).items():
+            predicted = self.layout.predict(button_name, anchor_name, anchor_loc)
+            if predicted is None or predicted in tried:
+                continue
+            tried.add(predicted)
+            
+            region = self.layout.verify_region(predicted, size)
+            try:
+                location = self._locate_in_region(button_name, button_path, region, confidence)
+            except Exception as e:
+                logger.debug(f"Layout check for {button_name} near {predicted} failed: {e}")
+                location = None
+            if location:
+                return location
+            logger.debug(f"{button_name} not at predicted {predicted} (anchor {anchor_name})")
+        return None
+    
+    def _find_from_layout_in_frame(self, button_name: str, frame: np.ndarray, origin: Tuple[int, int],
+                                   size: Tuple[int, int], confidence: Optional[float],
+                                   key: Optional[bytes] = None) -> Optional[Tuple[Tuple[int, int], float]]:
+        """Verify layout predictions on crops of an already-captured frame
+        
+        Returns:
+            ((x, y) screen center, score) or None if no prediction verified
+        """
+        tried = set()
+        for anchor_name, anchor_loc in self._layout_anchors(button_name).items():
+            predicted = self.layout.predict(button_name, anchor_name, anchor_loc)
+            if predicted is None or predicted in tried:
+                continue
+            tried.add(predicted)
+            
+            left, top, width, height = self.layout.verify_region(predicted, size)
+            left, top = max(0, left - origin[0]), max(0, top - origin[1])
+            patch = frame[top:top + height, left:left + width]
+            if patch.shape[0] < size[1] or patch.shape[1] < size[0]:
+                continue
+            found = self.match_frame(button_name, frame, confidence, key,
+                                     (left, top, patch.shape[1], patch.shape[0]))
+            if found:
+                (x, y), score = found
+                return ((origin[0] + x, origin[1] + y), score)
+            logger.debug(f"{button_name} not at predicted {predicted} (anchor {anchor_name})")
+        return None
+    
     def clear_cache(self, button_name: Optional[str] = None) -> None:
         """Clear cached button locations
         
@@ -124,6 +619,37 @@ class ButtonActions:
         logger.info(f"Clicked {button_name}")
         return True
     
+    def click_button_in_frame(self, button_name: str, frame: np.ndarray, origin: Tuple[int, int],
+                              offset: Tuple[int, int] = (0, 0),
+                              confidence: Optional[float] = None,
+                              roi: Optional[Tuple[int, int, int, int]] = None,
+                              key: Optional[bytes] = None) -> bool:
+        """Click a button found in an already-captured frame
+        
+        Args:
+            button_name: Button name
+            frame: Frame captured elsewhere (e.g. a background window capture)
+            origin: Screen (x, y) of the frame's top-left pixel
+            offset: Coordinate offset from button center
+            confidence: Detection confidence
+            roi: Optional (left, top, width, height) in frame coordinates to search
+                (e.g. from the color prefilter)
+            key: Frame cache key of `frame`, computed once per tick by the caller
+            
+        Returns:
+            True if clicked, False if not found
+        """
+        hit = self.detector.find_in_frame(button_name, frame, origin, roi, confidence, key)
+        if not hit:
+            return False
+        
+        (x, y), score = hit
+        x += offset[0]
+        y += offset[1]
+        self.input.wiggle_and_click(x, y)
+        logger.info(f"Clicked {button_name} at ({x}, {y}) (score {score:.2f})")
+        return True
+    
     def click_button_if_visible(self, button_name: str, region: Optional[Tuple[int, int, int, int]] = None,
                                offset: Tuple[int, int] = (0, 0)) -> bool:
         """Click button only if it's visible (doesn't log error if missing)
@@ -0,0 +1,94 @@
+"""
+Button layout model
+Records relative positions between buttons that share a fixed screen layout
+so one detected anchor predicts where the others should be
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ButtonLayout:
+    """Relative geometry between buttons in a stable layout"""
+
+    def __init__(self, buttons: Iterable[str], offsets: Optional[Dict[str, Tuple[int, int]]] = None,
+                 verify_margin: int = 12):
+        """Initialize layout model
+
+        Args:
+            buttons: Names of buttons that share this layout
+            offsets: Optional known positions per button, relative to any common origin
+            verify_margin: Pixels of slack around a predicted location when verifying
+        """
+        self.buttons = tuple(buttons)
+        self.verify_margin = verify_margin
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        for name, offset in (offsets or {}).items():
+            if name in self.buttons:
+                self.offsets[name] = (int(offset[0]), int(offset[1]))
+
+    def __contains__(self, button_name: str) -> bool:
+        return button_name in self.buttons
+
+    def record(self, button_name: str, location: Tuple[int, int],
+               anchors: Dict[str, Tuple[int, int]]) -> None:
+        """Learn a button's position relative to already-known anchors
+
+        Args:
+            button_name: Button that was just located
+            location: (x, y) center where it was found
+            anchors: Other known button centers seen in the same layout
+        """
+        if button_name not in self.buttons:
+            return
+
+        if not self.offsets:
+            # First observation defines the layout origin
+            self.offsets[button_name] = (0, 0)
+            logger.debug(f"Layout origin set at {button_name}")
+
+        for anchor_name, anchor_loc in anchors.items():
+            if anchor_name == button_name or anchor_name not in self.offsets:
+                continue
+            ax, ay = self.offsets[anchor_name]
+            offset = (ax + int(location[0]) - int(anchor_loc[0]),
+                      ay + int(location[1]) - int(anchor_loc[1]))
+            if self.offsets.get(button_name) != offset:
+                logger.debug(f"Layout offset for {button_name}: {offset} (via {anchor_name})")
+            self.offsets[button_name] = offset
+            return
+
+    def predict(self, button_name: str, anchor_name: str,
+                anchor_loc: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Predict a button's center from an anchor's center
+
+        Args:
+            button_name: Button to predict
+            anchor_name: Button whose location is known
+            anchor_loc: (x, y) center of the anchor
+
+        Returns:
+            Predicted (x, y) center or None if the relation is not known yet
+        """
+        if button_name not in self.offsets or anchor_name not in self.offsets:
+            return None
+        bx, by = self.offsets[button_name]
+        ax, ay = self.offsets[anchor_name]
+        return (int(anchor_loc[0]) + bx - ax, int(anchor_loc[1]) + by - ay)
+
+    def verify_region(self, center: Tuple[int, int], size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Small search region around a predicted center
+
+        Args:
+            center: Predicted (x, y) center
+            size: Template (width, height)
+
+        Returns:
+            (left, top, width, height) region covering the template plus margin
+        """
+        width, height = size
+        left = max(0, int(center[0]) - width // 2 - self.verify_margin)
+        top = max(0, int(center[1]) - height // 2 - self.verify_margin)
+        return (left, top, width + 2 * self.verify_margin, height + 2 * self.verify_margin)
@@ -0,0 +1,233 @@
+"""
+Per-button threshold calibration
+Runs every template over a recorded, labelled frame corpus and picks, per
+button, the most precise confidence threshold that still reaches a minimum
+recall (a safety margin above the best false match where recall allows) and
+the cheapest coarse stride that keeps precision/recall. Results are written to
+a JSON file the caller names; installed as buttons/thresholds.json, ButtonDetector
+loads them in place of the single global IMAGE_CONFIDENCE.
+"""
+
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+import template_matcher
+from config import (BUTTONS_DIR, THRESHOLDS_FILE, CALIBRATION_STRIDES, CALIBRATION_MIN_CONFIDENCE,
+                    CALIBRATION_MAX_CONFIDENCE, CALIBRATION_RECALL_TOLERANCE, CALIBRATION_MARGIN,
+                    CALIBRATION_MIN_NEGATIVES, CALIBRATION_MIN_RECALL)
+from synthetic_scenes import Scene, load_scenes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Calibration:
+    """Chosen settings for one button at one stride"""
+    confidence: float
+    stride: int
+    precision: float
+    recall: float
+    ms: float  # Mean match time per frame
+    frames: int
+    positives: int
+
+    def to_dict(self) -> dict:
+        return {
+            "confidence": round(self.confidence, 3),
+            "stride": self.stride,
+            "precision": round(self.precision, 4),
+            "recall": round(self.recall, 4),
+            "ms": round(self.ms, 2),
+            "frames": self.frames,
+            "positives": self.positives,
+        }
+
+
+def _evaluate(scores: np.ndarray, correct: np.ndarray, positives: int,
+              threshold: float) -> Tuple[float, float]:
+    """(precision, recall) of accepting every best match scoring >= threshold
+
+    Precision is 0.0 when nothing is accepted.
+    """
+    accepted = scores >= threshold
+    tp = int(np.count_nonzero(accepted & correct))
+    fp = int(np.count_nonzero(accepted & ~correct))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / positives if positives else 0.0
+    return precision, recall
+
+
+def best_threshold(scores: np.ndarray, correct: np.ndarray, positives: int,
+                   min_recall: float = CALIBRATION_MIN_RECALL,
+                   margin: float = CALIBRATION_MARGIN,
+                   floor: float = CALIBRATION_MIN_CONFIDENCE,
+                   ceiling: float = CALIBRATION_MAX_CONFIDENCE) -> Optional[Tuple[float, float, float]]:
+    """Most precise threshold in [floor, ceiling] that keeps recall >= min_recall
+
+    Among equally precise thresholds the one closest to `margin` above the best
+    false match wins, so unseen backgrounds have room below it without giving
+    up recall on the corpus.
+
+    Args:
+        scores: Best match score per frame (-1 when nothing matched)
+        correct: Whether that best match lies on a labelled instance
+        positives: Labelled instances in the corpus
+        min_recall: Lowest acceptable recall
+        margin: Preferred gap above the best false match
+        floor: Lowest threshold returned
+        ceiling: Highest threshold returned
+
+    Returns:
+        (threshold, precision, recall), or None if no threshold reaches min_recall
+    """
+    false_scores = scores[~correct & (scores > -1.0)]
+    preferred = float(false_scores.max()) + margin if len(false_scores) else floor
+    preferred = min(ceiling, max(floor, preferred))
+
+    # Raising a threshold up to the next true-match score only drops false matches
+    candidates = {floor, preferred}
+    candidates.update(float(s) for s in scores[correct] if floor <= s <= ceiling)
+
+    best = None
+    for threshold in candidates:
+        precision, recall = _evaluate(scores, correct, positives, threshold)
+        if recall < min_recall:
+            continue
+        rank = (precision, -abs(threshold - preferred))
+        if best is None or rank > best[0]:
+            best = (rank, (threshold, precision, recall))
+    return best[1] if best else None
+
+
+def calibrate_button(name: str, template: template_matcher.Template, frames: Sequence[np.ndarray],
+                     scenes: Sequence[Scene], strides: Sequence[int] = CALIBRATION_STRIDES,
+                     recall_tolerance: float = CALIBRATION_RECALL_TOLERANCE,
+                     min_recall: float = CALIBRATION_MIN_RECALL) -> Optional[Calibration]:
+    """Calibrate one template over a corpus
+
+    Args:
+        name: Button name (matches ground truth labels)
+        template: Loaded template
+        frames: Grayscale frames, one per scene
+        scenes: Labelled scenes
+        strides: Coarse strides to try
+        recall_tolerance: Recall a cheaper stride may give up
+        min_recall: Lowest acceptable recall at any stride
+
+    Returns:
+        Calibration, or None when the corpus has no instance of the button, too
+        few frames without it (CALIBRATION_MIN_NEGATIVES) or no stride reaches
+        min_recall
+    """
+    boxes = [[obj.box for obj in scene.objects if obj.name == name] for scene in scenes]
+    positives = sum(len(b) for b in boxes)
+    negatives = sum(1 for b in boxes if not b)
+    if not positives:
+        return None
+    if negatives < CALIBRATION_MIN_NEGATIVES:
+        logger.warning(f"Only {negatives} frames without {name} (need {CALIBRATION_MIN_NEGATIVES}); "
+                       f"record more normal play before calibrating it")
+        return None
+
+    results: List[Calibration] = []
+    for stride in strides:
+        scores = np.full(len(frames), -1.0, dtype=np.float32)
+        correct = np.zeros(len(frames), dtype=bool)
+        started = time.perf_counter()
+        for i, gray in enumerate(frames):
+            hit = template_matcher.match(gray, template, -1.0, stride=stride)
+            if hit is None:
+                continue
+            (x, y), scores[i] = hit
+            correct[i] = any(left <= x < left + w and top <= y < top + h for left, top, w, h in boxes[i])
+        ms = (time.perf_counter() - started) * 1000 / len(frames)
+        best = best_threshold(scores, correct, positives, min_recall)
+        if best is None:
+            logger.debug(f"{name} stride {stride}: recall below {min_recall:.2f} at every threshold")
+            continue
+        threshold, precision, recall = best
+        results.append(Calibration(threshold, stride, precision, recall, ms, len(frames), positives))
+        logger.debug(f"{name} stride {stride}: threshold {threshold:.3f}, precision {precision:.3f}, "
+                     f"recall {recall:.3f}, {ms:.1f}ms")
+
+    if not results:
+        logger.warning(f"{name} doesn't reach recall {min_recall:.2f} at any stride; "
+                       f"check the template against the corpus")
+        return None
+
+    top = max(results, key=lambda r: (r.precision, r.recall))
+    good = [r for r in results
+            if r.precision >= top.precision and r.recall >= top.recall - recall_tolerance]
+    return min(good, key=lambda r: r.ms)
+
+
+def calibrate(scenes: Sequence[Scene], buttons_dir: Path = BUTTONS_DIR,
+              names: Optional[Sequence[str]] = None) -> Dict[str, Calibration]:
+    """Calibrate every template in buttons_dir that appears in the corpus
+
+    Args:
+        scenes: Labelled scenes
+        buttons_dir: Template directory
+        names: Restrict to these buttons
+
+    Returns:
+        {button_name: Calibration}
+    """
+    names = names or sorted({obj.name for scene in scenes for obj in scene.objects})
+    frames = [cv2.cvtColor(scene.frame, cv2.COLOR_BGRA2GRAY) for scene in scenes]
+
+    calibrations = {}
+    for name in names:
+        path = Path(buttons_dir) / f"{name}.png"
+        template = template_matcher.Template.load(path) if path.exists() else None
+        if template is None:
+            logger.warning(f"No template for {name}, skipping")
+            continue
+        result = calibrate_button(name, template, frames, scenes)
+        if result is None:
+            logger.warning(f"Couldn't calibrate {name}, skipping")
+            continue
+        calibrations[name] = result
+        logger.info(f"{name}: confidence {result.confidence:.3f}, stride {result.stride} "
+                    f"(precision {result.precision:.3f}, recall {result.recall:.3f}, {result.ms:.1f}ms/frame)")
+    return calibrations
+
+
+def main() -> None:
+    """Calibrate per-button thresholds
+
+    Usage: python calibrate_thresholds.py <labelled_frames_dir> <output_json>
+    labelled_frames_dir is a corpus recorded from the game, labelled in the
+    synthetic_scenes.py format (PNG frames + ground_truth.json), with plenty of
+    frames where each button is absent. Copy the output to
+    buttons/thresholds.json once it looks right.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if len(sys.argv) < 3 or not Path(sys.argv[1]).is_dir():
+        logger.error("Usage: python calibrate_thresholds.py <labelled_frames_dir> <output_json>")
+        return
+    source, output = Path(sys.argv[1]), Path(sys.argv[2])
+
+    scenes = load_scenes(source)
+    logger.info(f"Calibrating on {len(scenes)} frames")
+
+    calibrations = calibrate(scenes)
+    if not calibrations:
+        logger.error("Nothing calibrated; is the corpus labelled?")
+        return
+    output.write_text(json.dumps({name: c.to_dict() for name, c in calibrations.items()}, indent=2))
+    logger.info(f"Wrote {len(calibrations)} thresholds to {output}")
+    if output.resolve() == (BUTTONS_DIR / THRESHOLDS_FILE).resolve():
+        logger.info("ButtonDetector loads this file automatically")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Color signature prefilter
+Cheap vectorized check that rejects frames before template matching or OCR
+Each template is reduced to its dominant quantized colors; a frame passes only
+where a template-sized window contains enough of those colors
+"""
+
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+
+class ColorSignature:
+    """Dominant-color mask of one template"""
+
+    def __init__(self, image: np.ndarray, bits: int = 2, coverage: float = 0.8, max_colors: int = 6):
+        """Build signature from a template image
+
+        Args:
+            image: BGR or BGRA template (alpha < 128 is ignored)
+            bits: Bits kept per channel when quantizing
+            coverage: Fraction of template pixels the dominant colors should cover
+            max_colors: Upper bound on dominant colors kept
+        """
+        self.bits = bits
+        self.size = (image.shape[1], image.shape[0])
+        bins = quantize(image, bits)
+        if image.ndim == 3 and image.shape[2] == 4:
+            bins = bins[image[..., 3] >= 128]
+        hist = np.bincount(bins.ravel(), minlength=1 << (3 * bits)).astype(np.float64)
+        hist /= max(1.0, hist.sum())
+
+        order = np.argsort(hist)[::-1]
+        cumulative = np.cumsum(hist[order])
+        count = min(max_colors, int(np.searchsorted(cumulative, coverage)) + 1)
+        self.colors = order[:count]
+        self.fraction = float(hist[self.colors].sum())
+
+        self.lut = np.zeros(1 << (3 * bits), dtype=np.float32)
+        self.lut[self.colors] = 1.0
+
+
+def quantize(image: np.ndarray, bits: int) -> np.ndarray:
+    """Map BGR(A) pixels to packed color bin indices
+
+    Args:
+        image: BGR or BGRA uint8 array
+        bits: Bits kept per channel
+
+    Returns:
+        Integer array of bin indices (same height/width as image)
+    """
+    shift = 8 - bits
+    pixels = image[..., :3] >> shift
+    b = pixels[..., 0].astype(np.intp)
+    g = pixels[..., 1].astype(np.intp)
+    r = pixels[..., 2].astype(np.intp)
+    return (b << (2 * bits)) | (g << bits) | r
+
+
+class ColorPrefilter:
+    """Rejects frames (or narrows the search ROI) using template color signatures"""
+
+    def __init__(self, buttons_dir: Path, downsample: int = 4, bits: int = 2, min_ratio: float = 0.6,
+                 enabled: bool = True):
+        """Initialize prefilter
+
+        Args:
+            buttons_dir: Directory containing PNG templates
+            downsample: Keep every Nth pixel of the frame before checking
+            bits: Bits kept per channel when quantizing colors
+            min_ratio: Fraction of the template's dominant-color share a window must reach
+            enabled: If False, every frame passes untouched
+        """
+        self.buttons_dir = Path(buttons_dir)
+        self.enabled = enabled
+        self.downsample = max(1, downsample)
+        self.bits = bits
+        self.min_ratio = min_ratio
+        self.signatures: Dict[str, Optional[ColorSignature]] = {}
+        self.checks: Dict[str, int] = {}
+        self.rejections: Dict[str, int] = {}
+
+    def signature(self, name: str) -> Optional[ColorSignature]:
+        """Load (once) the signature for a template
+
+        Returns:
+            ColorSignature or None if the template is missing
+        """
+        if name not in self.signatures:
+            path = self.buttons_dir / f"{name}.png"
+            image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED) if path.exists() else None
+            if image is None or image.ndim != 3:
+                logger.warning(f"No color template {path.name} in {self.buttons_dir}, "
+                               f"{name} will not be prefiltered")
+                self.signatures[name] = None
+            else:
+                self.signatures[name] = ColorSignature(image, self.bits)
+                logger.debug(f"Color signature for {name}: {len(self.signatures[name].colors)} colors, "
+                             f"{self.signatures[name].fraction:.0%} coverage")
+        return self.signatures[name]
+
+    def candidates(self, name: str, frame: np.ndarray) -> Optional[Region]:
+        """Find the part of a frame where a template could appear
+
+        Args:
+            name: Template name
+            frame: BGR or BGRA frame
+
+        Returns:
+            (left, top, width, height) ROI in frame coordinates, or None if rejected
+        """
+        height, width = frame.shape[:2]
+        sig = self.signature(name) if self.enabled else None
+        if sig is None:
+            return (0, 0, width, height)
+
+        self.checks[name] = self.checks.get(name, 0) + 1
+        step = self.downsample
+        small = frame[::step, ::step]
+        win_w = max(1, sig.size[0] // step)
+        win_h = max(1, sig.size[1] // step)
+        if small.shape[0] < win_h or small.shape[1] < win_w:
+            self.rejections[name] = self.rejections.get(name, 0) + 1
+            return None
+
+        mask = sig.lut[quantize(small, self.bits)]
+        density = cv2.boxFilter(mask, -1, (win_w, win_h), normalize=True,
+                                borderType=cv2.BORDER_CONSTANT)
+        ys, xs = np.nonzero(density >= sig.fraction * self.min_ratio)
+        if len(xs) == 0:
+            self.rejections[name] = self.rejections.get(name, 0) + 1
+            return None
+
+        # Window centers -> covering ROI in full-resolution coordinates
+        left = max(0, (int(xs.min()) - win_w // 2 - 1) * step)
+        top = max(0, (int(ys.min()) - win_h // 2 - 1) * step)
+        right = min(width, (int(xs.max()) + win_w - win_w // 2 + 1) * step)
+        bottom = min(height, (int(ys.max()) + win_h - win_h // 2 + 1) * step)
+        return (left, top, right - left, bottom - top)
+
+    def passes(self, name: str, frame: np.ndarray) -> bool:
+        """True if the template could appear anywhere in the frame"""
+        return self.candidates(name, frame) is not None
+
+    def rejection_rate(self, name: str) -> float:
+        """Fraction of checks for a template that were rejected"""
+        checks = self.checks.get(name, 0)
+        return self.rejections.get(name, 0) / checks if checks else 0.0
+
+    def report(self) -> Dict[str, Tuple[int, int, float]]:
+        """Per-template (checks, rejections, rejection rate)"""
+        return {name: (checks, self.rejections.get(name, 0), self.rejection_rate(name))
+                for name, checks in self.checks.items()}
+
+    def log_report(self) -> None:
+        """Log rejection rates for threshold tuning"""
+        for name, (checks, rejected, rate) in sorted(self.report().items()):
+            logger.info(f"Prefilter {name}: {rejected}/{checks} rejected ({rate:.1%})")
+
+
+def main() -> None:
+    """Report rejection rates of every template over a folder of recorded frames
+
+    Usage: python color_prefilter.py <frames_dir> [min_ratio]
+    """
+    from config import BUTTONS_DIR, BUTTON_TEMPLATES, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, PREFILTER_MIN_RATIO
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if len(sys.argv) < 2:
+        logger.error("Usage: python color_prefilter.py <frames_dir> [min_ratio]")
+        return
+    min_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else PREFILTER_MIN_RATIO
+    prefilter = ColorPrefilter(BUTTONS_DIR, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, min_ratio)
+
+    frames = sorted(Path(sys.argv[1]).glob("*.png"))
+    for path in frames:
+        frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if frame is None:
+            continue
+        for name in BUTTON_TEMPLATES:
+            prefilter.candidates(name, frame)
+
+    logger.info(f"{len(frames)} frames, min_ratio={min_ratio}")
+    prefilter.log_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,82 @@ PROJECT_ROOT = Path(__file__).parent
 BUTTONS_DIR = PROJECT_ROOT / "buttons"
 
 # ============ DETECTION ============
-IMAGE_CONFIDENCE = 0.8  # Default confidence for image matching (0.7-0.9)
+IMAGE_CONFIDENCE = 0.8  # Fallback confidence for buttons without a calibrated threshold (0.7-0.9)
 OCR_LANG = "eng"  # Tesseract language code
+BACKGROUND_CAPTURE = True  # Read the Roblox window directly (works while covered); focus only before input
+CAPTURE_BUFFER_SLOTS = 3  # Reused capture buffers per frame kind (frames stay valid for N-1 grabs)
+
+# ============ FRAME RESULT CACHE ============
+# Button hits and OCR words memoised per frame/ROI hash; static screens skip re-detection
+FRAME_CACHE_ENABLED = True
+FRAME_CACHE_ENTRIES = 64  # Frames/ROIs kept (LRU)
+FRAME_CACHE_MODE = "content"  # "content" (exact full-frame hash) or "perceptual" (tolerates noise, may reuse stale hits)
+
+# ============ OCR PIPELINE ============
+# Text regions are proposed from edge density, deskewed, upscaled and binarised,
+# then stacked into one image so each frame costs a single Tesseract call
+OCR_PIPELINE = True  # False = OCR the whole image/ROI as before
+OCR_TEXT_HEIGHT = 40  # Crops are scaled so text lines are about this tall (px)
+OCR_MAX_REGIONS = 12  # Most text regions OCR'd per frame (largest first)
+OCR_MIN_REGION_AREA = 60  # Ignore smaller edge blobs (px at frame scale)
+OCR_PSM = 6  # Tesseract page segmentation mode for the stacked crops
+
+# ============ THRESHOLD CALIBRATION ============
+# calibrate_thresholds.py computes per-button confidence/stride from a recorded, labelled corpus
+THRESHOLDS_FILE = "thresholds.json"  # Per-button thresholds ButtonDetector loads from the buttons dir
+CALIBRATION_STRIDES = (4, 3, 2)  # Coarse strides tried; the cheapest one that keeps accuracy wins
+CALIBRATION_MIN_CONFIDENCE = 0.6  # Never calibrate a threshold below this
+CALIBRATION_MAX_CONFIDENCE = 0.99
+CALIBRATION_RECALL_TOLERANCE = 0.02  # Recall a cheaper stride may give up vs the best one
+CALIBRATION_MARGIN = 0.1  # Threshold sits this far above the best false match when recall allows
+CALIBRATION_MIN_RECALL = 0.9  # Buttons whose template can't reach this on the corpus aren't calibrated
+CALIBRATION_MIN_NEGATIVES = 20  # Frames without a button needed before its threshold is calibrated
+
+# ============ COLOR PREFILTER ============
+# Cheap dominant-color check that skips template matching / OCR on frames that can't match
+PREFILTER_ENABLED = True
+PREFILTER_DOWNSAMPLE = 4  # Check every Nth pixel
+PREFILTER_COLOR_BITS = 2  # Bits per channel when quantizing colors
+PREFILTER_MIN_RATIO = 0.6  # Share of the template's dominant colors a window needs (lower = fewer rejections)
+
+# ============ PROBE SENTINELS ============
+# High-frequency pixel probes at known dialog locations (learn with probe_sentinel.py)
+PROBE_SIGNATURES_FILE = PROJECT_ROOT / "probe_signatures.json"
+PROBE_POINTS = 32  # Probe pixels per learned signature
+PROBE_MIN_MATCH = 0.85  # Fraction of probes that must match
+SENTINEL_HZ = 30  # Probe sampling rate
+SENTINEL_FULL_CHECK_INTERVAL = 10  # Seconds between full OCR checks without a probe hit
+SENTINEL_WINDOW_FALLBACK_INTERVAL = 1.0  # Min seconds between full window captures when the window DC reads black
+
+# ============ MULTI-WINDOW SUPERVISOR ============
+SUPERVISOR_WORKERS = 4  # Worker threads shared by all client windows
+SUPERVISOR_INTERVAL = 1.0  # Target seconds between checks of the same window
+SUPERVISOR_REFRESH_INTERVAL = 5.0  # Seconds between window list refreshes
+SUPERVISOR_REPORT_INTERVAL = 60.0  # Seconds between fairness/latency reports
+
+# ============ BOT RUNTIME ============
+# One loop hosting bot behaviours as plugins (python bot_runtime.py ranked afk).
+# Higher priority runs first; a behaviour that sends input preempts lower ones that tick.
+STOP_HOTKEY = "ctrl+shift+p"
+RUNTIME_BEHAVIOURS = {
+    "modal": {"priority": 100, "interval": 1.0, "budget": 0.5},  # Full-frame OCR; only on probe hits when signatures are learned
+    "reconnect": {"priority": 90, "interval": 2.0, "budget": 0.05},
+    "ranked": {"priority": 10, "interval": 1.0, "budget": 0.1},
+}
+RUNTIME_MAX_BACKOFF = 8  # Max interval multiplier for a behaviour that keeps overrunning its budget
+RUNTIME_REPORT_INTERVAL = 60.0  # Seconds between per-behaviour timing reports
+ASYNC_WORKERS = 4  # Threads the *_async APIs offload capture/detection/OCR to (input uses its own single thread)
+
+# ============ SOAK TEST ============
+# Bounds for soak_test.py (long simulated runs against the headless capture backend)
+SOAK_SAMPLE_INTERVAL = 60.0  # Simulated seconds between resource samples
+SOAK_WARMUP = 0.1  # Share of the run ignored while caches/pools fill up
+SOAK_MAX_RSS_GROWTH_MB = 32  # RSS growth allowed after warmup
+SOAK_MAX_OBJECT_GROWTH = 0.05  # Relative growth of live Python objects allowed after warmup
+SOAK_MAX_CACHE_ENTRIES = 256  # Any tracked cache/dict larger than this fails the run
+SOAK_MAX_LATENCY_GROWTH = 1.5  # Allowed ratio of the fitted end-of-run to start-of-run median tick latency
+SOAK_MAX_TICK_LATENCY = 0.5  # Absolute ceiling in seconds on the post-warmup per-tick latency p95
+SOAK_MIN_CACHE_HIT_RATE = 0.5  # Frame cache hit rate required when the replayed frames fit in the cache
 
 # ============ INPUT BEHAVIOR ============
 HUMAN_MOVE_STEPS = 3  # Easing steps for mouse movement
@@ -26,8 +100,13 @@ WIGGLE_MIN_DELAY = 0.015
 WIGGLE_MAX_DELAY = 0.019
 
 # ============ TIMING ============
-FOCUS_DELAY = 0.1  # Delay after focusing window
-ROBLOX_STARTUP_WAIT = 5  # Seconds to wait for Roblox to start
+FOCUS_DELAY = 0.1  # Max wait for maximize/foreground to take effect
+ROBLOX_STARTUP_WAIT = 60  # Deadline (s) for Roblox to become ready after starting
+READY_POLL_INTERVAL = 0.05  # First readiness poll interval
+READY_POLL_BACKOFF = 1.5  # Poll interval multiplier after each miss
+READY_POLL_MAX_INTERVAL = 0.5  # Cap on readiness poll interval
+READY_STABLE_POLLS = 2  # Consecutive identical window rects before it counts as settled
+BLANK_FRAME_RANGE = 8  # Min gray-level spread for a frame to count as rendered
 DEFAULT_ACTION_DELAY = 0.1  # Delay after actions
 
 # ============ BUTTON TEMPLATES ============
@@ -46,6 +125,13 @@ BUTTON_OFFSETS = {
     "ranked": (0, -15),  # Click 15px above center
 }
 
+# ============ BUTTON LAYOUT ============
+# Buttons that sit in a fixed arrangement. Once one is found, the others are
+# predicted from it and verified with a small patch check instead of a full search.
+LAYOUT_BUTTONS = ("fight", "ranked", "refresh")
+BUTTON_LAYOUT = {}  # Optional known centers, e.g. {"fight": (0, 0), "ranked": (0, 80)}; learned if empty
+LAYOUT_VERIFY_MARGIN = 12  # Pixels of slack around a predicted location
+
 def get_button_path(button_name: str) -> str:
     """Get full path to button template"""
     if button_name not in BUTTON_TEMPLATES:
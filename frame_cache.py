@@ -0,0 +1,180 @@
+"""
+Frame-level result cache
+Bounded LRU of detection results keyed by a hash of the frame they were
+computed on. Callers hash each captured frame once per tick (key()) and pass
+that key with every lookup; results for part of a frame name the ROI in their
+kind. Menus and dialogs sit still for many ticks, so repeated template matches
+and OCR on an unchanged screen become dictionary lookups.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+def content_hash(image: np.ndarray) -> bytes:
+    """Exact hash of every byte of the image (plus the shape)
+
+    A sampled hash would miss small changes such as a toggled checkbox or a
+    one-line text update, and serve a stale result for them.
+
+    Args:
+        image: Any frame or ROI
+
+    Returns:
+        16-byte key
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16)
+    digest.update(repr(image.shape).encode())
+    return digest.digest()
+
+
+def perceptual_hash(image: np.ndarray, grid: int = 32, bits: int = 4) -> bytes:
+    """Noise-tolerant hash: block means on a grid, quantized
+
+    Changes that keep every block mean within its quantization step (cursor
+    blinks, faint dithering) map to the same key. It is still an exact key, so
+    noise that tips a single block over a step boundary is a miss.
+
+    Args:
+        image: Any frame or ROI
+        grid: Blocks per side
+        bits: Bits kept per block mean
+
+    Returns:
+        Key bytes
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (grid, grid), interpolation=cv2.INTER_AREA)
+    quantized = (small >> (8 - bits)).astype(np.uint8)
+    return quantized.tobytes() + repr(image.shape).encode()
+
+
+HASHERS: Dict[str, Callable[[np.ndarray], bytes]] = {
+    "content": content_hash,
+    "perceptual": perceptual_hash,
+}
+
+
+class FrameCache:
+    """LRU of per-frame results (button hits, OCR words, ...)"""
+
+    def __init__(self, max_entries: int = 64, mode: str = "content", enabled: bool = True):
+        """Initialize cache
+
+        Args:
+            max_entries: Frames (keys) kept; least recently used are evicted
+            mode: "content" (exact full-image hash) or "perceptual" (quantized block means)
+            enabled: False turns every lookup into a plain compute
+        """
+        if mode not in HASHERS:
+            raise ValueError(f"Unknown frame cache mode: {mode} (choose from {', '.join(HASHERS)})")
+        self.max_entries = max(1, max_entries)
+        self.mode = mode
+        self.enabled = enabled
+        self._hasher = HASHERS[mode]
+        self._entries: "OrderedDict[bytes, Dict[Hashable, object]]" = OrderedDict()
+        self._lock = threading.Lock()  # Shared by the *_async worker threads
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, image: np.ndarray) -> Optional[bytes]:
+        """Hash an image (None when disabled)"""
+        return self._hasher(image) if self.enabled else None
+
+    def _lookup(self, key: bytes, kind: Hashable):
+        """Cached result or _MISSING; caller holds _lock"""
+        results = self._entries.get(key)
+        if results is None or kind not in results:
+            return _MISSING
+        self._entries.move_to_end(key)
+        return results[kind]
+
+    def get(self, key: Optional[bytes], kind: Hashable, default=None):
+        """Cached result of `kind` for a frame key, or `default`"""
+        if key is None:
+            return default
+        with self._lock:
+            value = self._lookup(key, kind)
+        return default if value is _MISSING else value
+
+    def put(self, key: Optional[bytes], kind: Hashable, value) -> None:
+        """Store a result for a frame key, evicting the oldest frames past max_entries"""
+        if key is None:
+            return
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                results = self._entries[key] = {}
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entries.move_to_end(key)
+            results[kind] = value
+
+    def cached(self, image: np.ndarray, kind: Hashable, compute: Callable[[], T],
+               key: Optional[bytes] = None) -> T:
+        """Return the cached result for (image, kind) or compute and store it
+
+        Args:
+            image: Frame the result depends on
+            kind: Result type and parameters, e.g. ("button", "fight", 0.8, 3, roi)
+            compute: Produces the result on a miss
+            key: key() of `image`, computed once per tick by the caller (hashed
+                here when omitted)
+
+        Returns:
+            Cached or freshly computed result
+        """
+        if not self.enabled:
+            return compute()
+        if key is None:
+            key = self.key(image)
+        with self._lock:
+            value = self._lookup(key, kind)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        self.put(key, kind, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters"""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hit_rate}
+
+    def log_report(self) -> None:
+        """Log cache effectiveness"""
+        if not self.enabled:
+            return
+        logger.info(f"Frame cache ({self.mode}): {self.hits} hits / {self.misses} misses "
+                    f"({self.hit_rate:.1%}), {self.evictions} evictions, {len(self._entries)} entries")
@@ -8,7 +8,9 @@ import time
 import random
 import math
 import logging
-from typing import Tuple
+from typing import Callable, Optional, Tuple
+
+from async_utils import run_input
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +25,8 @@ class InputSimulator:
                  wiggle_min_offset: Tuple[int, int] = (-2, -1),
                  wiggle_max_offset: Tuple[int, int] = (2, 1),
                  wiggle_min_delay: float = 0.015,
-                 wiggle_max_delay: float = 0.019):
+                 wiggle_max_delay: float = 0.019,
+                 before_input: Optional[Callable[[], object]] = None):
         """Initialize input simulator with behavior parameters
         
         Args:
@@ -35,6 +38,8 @@ class InputSimulator:
             wiggle_max_offset: Max (x, y) offset for wiggle
             wiggle_min_delay: Min wiggle step delay
             wiggle_max_delay: Max wiggle step delay
+            before_input: Optional hook run right before a click, key press or drag
+                (e.g. focus the game window only when input is actually sent)
         """
         self.move_steps = move_steps
         self.move_min_delay = move_min_delay
@@ -44,6 +49,12 @@ class InputSimulator:
         self.wiggle_max_offset = wiggle_max_offset
         self.wiggle_min_delay = wiggle_min_delay
         self.wiggle_max_delay = wiggle_max_delay
+        self.before_input = before_input
+    
+    def _prepare_input(self) -> None:
+        """Run the before_input hook, if any"""
+        if self.before_input is not None:
+            self.before_input()
     
     def human_move(self, x: int, y: int, steps: int = None) -> None:
         """Move mouse with cosine easing (smooth, human-like)
@@ -74,6 +85,7 @@ class InputSimulator:
             x, y: Click coordinates
             clicks: Number of clicks
         """
+        self._prepare_input()
         self.human_move(x, y)
         
         # Gentle wiggle
@@ -94,6 +106,7 @@ class InputSimulator:
             key: Key name (e.g., 'w', 'space', 'enter')
             duration: How long to hold the key
         """
+        self._prepare_input()
         pydirectinput.keyDown(key)
         time.sleep(duration + random.uniform(-0.05, 0.05))
         pydirectinput.keyUp(key)
@@ -107,6 +120,7 @@ class InputSimulator:
             x2, y2: Ending coordinates
             duration: Duration of drag
         """
+        self._prepare_input()
         self.human_move(x1, y1)
         pydirectinput.mouseDown()
         time.sleep(0.05)
@@ -124,3 +138,15 @@ class InputSimulator:
         time.sleep(0.05)
         pydirectinput.mouseUp()
         logger.debug(f"Dragged from ({x1}, {y1}) to ({x2}, {y2})")
+    
+    async def wiggle_and_click_async(self, x: int, y: int, clicks: int = 1) -> None:
+        """wiggle_and_click() on the serial input thread (see async_utils)"""
+        await run_input(self.wiggle_and_click, x, y, clicks)
+    
+    async def press_key_async(self, key: str, duration: float = 0.1) -> None:
+        """press_key() on the serial input thread"""
+        await run_input(self.press_key, key, duration)
+    
+    async def drag_async(self, x1: int, y1: int, x2: int, y2: int, duration: float = 0.3) -> None:
+        """drag() on the serial input thread"""
+        await run_input(self.drag, x1, y1, x2, y2, duration)
@@ -0,0 +1,224 @@
+"""
+Modal text detection
+Shared OCR for the "dismiss" modals handled by every bot. Text regions are
+proposed from edge density, deskewed, upscaled and binarised, and all crops
+of a frame are read with a single Tesseract call.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+
+from config import (TESSERACT_PATH, OCR_LANG, OCR_PIPELINE, OCR_TEXT_HEIGHT, OCR_MAX_REGIONS,
+                    OCR_MIN_REGION_AREA, OCR_PSM)
+from async_utils import run_blocking
+from frame_cache import FrameCache
+
+logger = logging.getLogger(__name__)
+
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+Region = Tuple[int, int, int, int]
+
+# White gap between stacked crops so Tesseract keeps them on separate lines
+_STACK_GAP = 16
+
+
+@dataclass
+class OcrWord:
+    """One recognised word"""
+    text: str
+    box: Region  # (left, top, width, height) in the input image
+    confidence: float
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return (self.box[0] + self.box[2] // 2, self.box[1] + self.box[3] // 2)
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Otsu binarisation with dark text on a light background (what Tesseract expects)"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Text is the minority class; make sure it ends up black
+    if np.count_nonzero(binary) < binary.size // 2:
+        cv2.bitwise_not(binary, dst=binary)
+    return binary
+
+
+def propose_text_regions(gray: np.ndarray, max_regions: int = OCR_MAX_REGIONS,
+                         min_area: int = OCR_MIN_REGION_AREA) -> List[Region]:
+    """Boxes likely to hold text, from edge density and connected components
+
+    Strong gradients are thresholded, smeared horizontally so letters of a word
+    join up, and each connected blob with a text-like shape becomes a box.
+
+    Args:
+        gray: Grayscale image
+        max_regions: Keep the largest N boxes
+        min_area: Minimum blob area in pixels
+
+    Returns:
+        [(left, top, width, height), ...] largest first
+    """
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    joined = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3)))
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    height, width = gray.shape[:2]
+    boxes = []
+    for left, top, w, h, area in stats[1:count]:
+        if area < min_area or h < 6 or h > height // 3 or w < h * 0.8 or w > width * 0.9:
+            continue
+        if area / float(w * h) < 0.25:  # Outlines and thin frames, not text
+            continue
+        pad = max(2, h // 4)
+        left, top = max(0, left - pad), max(0, top - pad)
+        boxes.append((int(left), int(top), int(min(width - left, w + 2 * pad)), int(min(height - top, h + 2 * pad))))
+
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    return boxes[:max_regions]
+
+
+def prepare_crop(crop: np.ndarray, text_height: int = OCR_TEXT_HEIGHT) -> Tuple[np.ndarray, np.ndarray]:
+    """Deskew, upscale and binarise one text crop
+
+    Args:
+        crop: Grayscale crop
+        text_height: Target height of the text line in pixels
+
+    Returns:
+        (prepared binary image, 2x3 affine mapping crop -> prepared coordinates)
+    """
+    binary = binarize(crop)
+    ys, xs = np.nonzero(binary == 0)
+    angle = 0.0
+    if len(xs) >= 10:
+        _, (rect_w, rect_h), angle = cv2.minAreaRect(np.column_stack([xs, ys]).astype(np.float32))
+        # The angle convention differs between OpenCV versions; measure from the
+        # long side and fold to a small correction around horizontal
+        if rect_w < rect_h:
+            angle += 90
+        angle = (angle + 45) % 90 - 45
+        if abs(angle) > 15:
+            angle = 0.0
+
+    scale = max(1.0, text_height / max(1, crop.shape[0]))
+    center = (crop.shape[1] / 2, crop.shape[0] / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, scale)
+    out_w, out_h = int(round(crop.shape[1] * scale)), int(round(crop.shape[0] * scale))
+    matrix[0, 2] += out_w / 2 - center[0]
+    matrix[1, 2] += out_h / 2 - center[1]
+    prepared = cv2.warpAffine(crop, matrix, (out_w, out_h), flags=cv2.INTER_CUBIC,
+                              borderMode=cv2.BORDER_REPLICATE)
+    return binarize(prepared), matrix
+
+
+def _stack(crops: Sequence[np.ndarray]) -> Tuple[np.ndarray, List[int]]:
+    """Stack binary crops vertically on white; returns canvas and each crop's top"""
+    width = max(c.shape[1] for c in crops) + 2 * _STACK_GAP
+    height = sum(c.shape[0] for c in crops) + _STACK_GAP * (len(crops) + 1)
+    canvas = np.full((height, width), 255, dtype=np.uint8)
+    tops = []
+    y = _STACK_GAP
+    for crop in crops:
+        canvas[y:y + crop.shape[0], _STACK_GAP:_STACK_GAP + crop.shape[1]] = crop
+        tops.append(y)
+        y += crop.shape[0] + _STACK_GAP
+    return canvas, tops
+
+
+def read_words(gray: np.ndarray, boxes: Optional[Sequence[Region]] = None,
+               cache: Optional[FrameCache] = None, key: Optional[bytes] = None) -> List[OcrWord]:
+    """OCR the proposed text regions of an image with one Tesseract call
+
+    Args:
+        gray: Grayscale image
+        boxes: Regions to read (proposed automatically when None)
+        cache: Optional frame cache; an unchanged image skips OCR entirely
+        key: cache.key() of `gray`, computed once per tick by the caller
+
+    Returns:
+        Recognised words with boxes in `gray` coordinates
+    """
+    if cache is not None:
+        kind = ("ocr", tuple(boxes) if boxes is not None else None)
+        return list(cache.cached(gray, kind, lambda: tuple(read_words(gray, boxes)), key))
+
+    boxes = list(boxes) if boxes is not None else propose_text_regions(gray)
+    if not boxes:
+        return []
+
+    prepared, inverses = [], []
+    for left, top, width, height in boxes:
+        crop, matrix = prepare_crop(gray[top:top + height, left:left + width])
+        prepared.append(crop)
+        inverses.append(cv2.invertAffineTransform(matrix))
+    canvas, tops = _stack(prepared)
+
+    data = pytesseract.image_to_data(canvas, lang=OCR_LANG, config=f"--psm {OCR_PSM}",
+                                     output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text:
+            continue
+        cx = data["left"][i] + data["width"][i] / 2 - _STACK_GAP
+        cy = data["top"][i] + data["height"][i] / 2
+        # Which crop's band the word sits in
+        index = max(0, int(np.searchsorted(tops, cy, side="right")) - 1)
+        local_y = cy - tops[index]
+        inverse = inverses[index]
+        x, y = inverse @ np.array([cx, local_y, 1.0])
+        scale = float(np.hypot(inverse[0, 0], inverse[0, 1]))
+        w, h = data["width"][i] * scale, data["height"][i] * scale
+        left, top = boxes[index][:2]
+        words.append(OcrWord(text, (int(left + x - w / 2), int(top + y - h / 2), int(w), int(h)),
+                             float(data["conf"][i]) if "conf" in data else -1.0))
+    return words
+
+
+def find_text(gray: np.ndarray, word: str = "dismiss", cache: Optional[FrameCache] = None,
+              key: Optional[bytes] = None) -> Optional[Tuple[int, int]]:
+    """Find the center of the first OCR word containing `word`
+
+    Args:
+        gray: Grayscale image (frame or ROI crop)
+        word: Case-insensitive substring to look for
+        cache: Optional frame cache for the recognised words
+        key: cache.key() of `gray`, computed once per tick by the caller
+
+    Returns:
+        (x, y) center in `gray` coordinates or None
+    """
+    word = word.lower()
+    if OCR_PIPELINE:
+        for found in read_words(gray, cache=cache, key=key):
+            if word in found.text.lower():
+                return found.center
+        return None
+
+    if cache is not None:
+        data = cache.cached(gray, ("ocr_data",), lambda: pytesseract.image_to_data(
+            gray, lang=OCR_LANG, output_type=pytesseract.Output.DICT), key)
+    else:
+        data = pytesseract.image_to_data(gray, lang=OCR_LANG, output_type=pytesseract.Output.DICT)
+    for i, text in enumerate(data["text"]):
+        if word in text.lower():
+            return (data["left"][i] + data["width"][i] // 2,
+                    data["top"][i] + data["height"][i] // 2)
+    return None
+
+
+async def find_text_async(gray: np.ndarray, word: str = "dismiss",
+                          cache: Optional[FrameCache] = None) -> Optional[Tuple[int, int]]:
+    """find_text() on a worker thread (see async_utils)
+
+    OCRs a private copy of `gray`, so a pooled capture buffer can be reused by
+    the caller while the OCR runs.
+    """
+    return await run_blocking(find_text, gray.copy(), word, cache)
@@ -0,0 +1,305 @@
+"""
+Pixel-probe sentinels
+Samples a few dozen pixels at known dialog locations many times per second and
+only escalates to OCR / template matching when their colors match a learned
+dialog signature. Signatures are learned from recorded frames.
+"""
+
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from screen_capture import ScreenCapture
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+
+class ProbeSignature:
+    """Expected colors at a set of window-relative probe points"""
+
+    def __init__(self, name: str, points: np.ndarray, colors: np.ndarray, tolerances: np.ndarray,
+                 min_match: float = 0.85):
+        """Initialize signature
+
+        Args:
+            name: Dialog name (e.g. "disconnect")
+            points: (N, 2) probe positions as fractions of window (x, y)
+            colors: (N, 3) expected BGR colors
+            tolerances: (N,) max per-channel deviation per probe
+            min_match: Fraction of probes that must match
+        """
+        self.name = name
+        self.points = np.asarray(points, dtype=np.float32)
+        self.colors = np.asarray(colors, dtype=np.int16)
+        self.tolerances = np.asarray(tolerances, dtype=np.int16)
+        self.min_match = min_match
+
+    def pixel_coords(self, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Absolute (xs, ys) of the probes for a window size"""
+        xs = np.clip((self.points[:, 0] * width).astype(np.intp), 0, width - 1)
+        ys = np.clip((self.points[:, 1] * height).astype(np.intp), 0, height - 1)
+        return xs, ys
+
+    def score(self, samples: np.ndarray) -> float:
+        """Fraction of probes within tolerance
+
+        Args:
+            samples: (N, 3+) sampled BGR(A) pixels, in probe order
+        """
+        diff = np.abs(samples[:, :3].astype(np.int16) - self.colors).max(axis=1)
+        return float(np.count_nonzero(diff <= self.tolerances)) / len(self.tolerances)
+
+    def matches_frame(self, frame: np.ndarray) -> bool:
+        """Check a full window frame against the signature"""
+        xs, ys = self.pixel_coords(frame.shape[1], frame.shape[0])
+        return self.score(frame[ys, xs]) >= self.min_match
+
+    def to_dict(self) -> dict:
+        return {
+            "points": self.points.round(5).tolist(),
+            "colors": self.colors.tolist(),
+            "tolerances": self.tolerances.tolist(),
+            "min_match": self.min_match,
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "ProbeSignature":
+        return cls(name, np.array(data["points"]), np.array(data["colors"]),
+                   np.array(data["tolerances"]), data.get("min_match", 0.85))
+
+
+def learn_signature(name: str, positives: List[np.ndarray], negatives: List[np.ndarray],
+                    count: int = 32, lattice: Tuple[int, int] = (64, 36), min_tolerance: int = 12,
+                    min_match: float = 0.85) -> ProbeSignature:
+    """Pick probe points that are stable on the dialog and distinct from normal play
+
+    Args:
+        name: Dialog name
+        positives: BGR(A) frames with the dialog visible
+        negatives: BGR(A) frames without it
+        count: Number of probes to keep
+        lattice: Candidate grid (columns, rows) over the window
+        min_tolerance: Smallest per-channel tolerance per probe
+        min_match: Fraction of probes that must match at runtime
+
+    Returns:
+        Learned ProbeSignature
+    """
+    if not positives:
+        raise ValueError("Need at least one frame showing the dialog")
+
+    cols, rows = lattice
+    gx, gy = np.meshgrid((np.arange(cols) + 0.5) / cols, (np.arange(rows) + 0.5) / rows)
+    candidates = np.stack([gx.ravel(), gy.ravel()], axis=1).astype(np.float32)
+
+    def sample(frames: List[np.ndarray]) -> np.ndarray:
+        out = []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            xs = np.clip((candidates[:, 0] * w).astype(np.intp), 0, w - 1)
+            ys = np.clip((candidates[:, 1] * h).astype(np.intp), 0, h - 1)
+            out.append(frame[ys, xs, :3].astype(np.float32))
+        return np.stack(out)  # (frames, candidates, 3)
+
+    pos = sample(positives)
+    mean = pos.mean(axis=0)
+    spread = pos.std(axis=0).max(axis=1)
+    if negatives:
+        neg = sample(negatives)
+        distinct = np.abs(neg - mean).max(axis=2).min(axis=0)  # Closest negative per candidate
+    else:
+        distinct = np.full(len(candidates), 255.0, dtype=np.float32)
+
+    tolerance = np.maximum(min_tolerance, 3 * spread)
+    quality = distinct - tolerance
+    order = np.argsort(quality)[::-1]
+    keep = [i for i in order if quality[i] > 0][:count]
+    if len(keep) < count:
+        logger.warning(f"Only {len(keep)} distinctive probe points found for {name}")
+    if not keep:
+        keep = list(order[:count])
+
+    keep = np.asarray(keep)
+    return ProbeSignature(name, candidates[keep], mean[keep].round(), np.ceil(tolerance[keep]), min_match)
+
+
+class ProbeSentinel:
+    """Samples probe pixels of a window and reports which signature matches"""
+
+    def __init__(self, signatures: Iterable[ProbeSignature], capture: Optional[ScreenCapture] = None,
+                 window_fallback_interval: float = 1.0):
+        """Initialize sentinel
+
+        Args:
+            signatures: Dialog signatures to watch for
+            capture: Capture used for sampling (a small dedicated one by default)
+            window_fallback_interval: Min seconds between full window captures in
+                check_window() when the window's DC reads back black
+        """
+        self.signatures: Dict[str, ProbeSignature] = {sig.name: sig for sig in signatures}
+        self.capture = capture or ScreenCapture(slots=1)
+        self.window_fallback_interval = window_fallback_interval
+        self.samples_taken = 0
+        self.window_fallbacks = 0
+        self.hits: Dict[str, int] = {}
+        self._last_fallback = float("-inf")
+
+    def __bool__(self) -> bool:
+        return bool(self.signatures)
+
+    @classmethod
+    def load(cls, path: Path, capture: Optional[ScreenCapture] = None,
+             window_fallback_interval: float = 1.0) -> "ProbeSentinel":
+        """Load signatures from a JSON file (missing file = no signatures)"""
+        path = Path(path)
+        signatures = []
+        if path.exists():
+            data = json.loads(path.read_text())
+            signatures = [ProbeSignature.from_dict(name, sig) for name, sig in data.items()]
+            logger.info(f"Loaded {len(signatures)} probe signatures from {path.name}")
+        else:
+            logger.info(f"No probe signatures at {path}, sentinel disabled")
+        return cls(signatures, capture, window_fallback_interval)
+
+    def save(self, path: Path) -> None:
+        """Write all signatures to a JSON file"""
+        data = {name: sig.to_dict() for name, sig in self.signatures.items()}
+        Path(path).write_text(json.dumps(data, indent=2))
+
+    def _probe_points(self, width: int, height: int) -> Tuple[Dict[str, int], np.ndarray]:
+        """Probe counts per signature and all probes' (x, y) for a window size"""
+        coords = {name: sig.pixel_coords(width, height) for name, sig in self.signatures.items()}
+        xs = np.concatenate([xs for xs, _ in coords.values()])
+        ys = np.concatenate([ys for _, ys in coords.values()])
+        return {name: len(xs) for name, (xs, _) in coords.items()}, np.stack([xs, ys], axis=1)
+
+    def _match_samples(self, counts: Dict[str, int], samples: np.ndarray) -> Optional[str]:
+        """Score samples laid out as by _probe_points()"""
+        self.samples_taken += 1
+        start = 0
+        for name, sig in self.signatures.items():
+            if sig.score(samples[start:start + counts[name]]) >= sig.min_match:
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return name
+            start += counts[name]
+        return None
+
+    def check(self, region: Region) -> Optional[str]:
+        """Sample probes inside a window region
+
+        Only the probe pixels themselves are captured (see ScreenCapture.grab_points).
+
+        Args:
+            region: (left, top, width, height) of the window
+
+        Returns:
+            Name of the first matching signature, or None
+        """
+        if not self.signatures:
+            return None
+        left, top, width, height = region
+        counts, points = self._probe_points(width, height)
+        samples = self.capture.grab_points(points + (left, top))
+        if samples is None:
+            return None
+        return self._match_samples(counts, samples)
+
+    def check_frame(self, frame: np.ndarray) -> Optional[str]:
+        """Check probes against a full window frame
+
+        Args:
+            frame: BGR(A) frame whose (0, 0) is the window's top-left
+
+        Returns:
+            Name of the first matching signature, or None
+        """
+        self.samples_taken += 1
+        for name, sig in self.signatures.items():
+            if sig.matches_frame(frame):
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return name
+        return None
+
+    def check_window(self, hwnd: int) -> Optional[str]:
+        """Sample probes from the window's own pixels (works while covered)
+
+        Only the probe pixels are read from the window's DC. Windows that
+        present through DirectX read back black there; for those a full
+        window capture is checked instead, at most every
+        `window_fallback_interval` seconds.
+
+        Args:
+            hwnd: Window handle
+
+        Returns:
+            Name of the first matching signature, or None
+        """
+        if not self.signatures:
+            return None
+        width, height = self.capture.window_size(hwnd)
+        if width <= 0 or height <= 0:
+            return None
+        counts, points = self._probe_points(width, height)
+        samples = self.capture.grab_window_points(hwnd, points)
+        if samples is not None and samples[:, :3].any():
+            return self._match_samples(counts, samples)
+
+        now = time.monotonic()
+        if now - self._last_fallback < self.window_fallback_interval:
+            return None
+        self._last_fallback = now
+        self.window_fallbacks += 1
+        frame = self.capture.grab_window(hwnd)
+        if frame is None:
+            return None
+        return self.check_frame(frame)
+
+
+def _load_frames(folder: Path) -> List[np.ndarray]:
+    frames = []
+    for path in sorted(Path(folder).glob("*.png")):
+        frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def main() -> None:
+    """Learn a probe signature from recorded frames
+
+    Usage: python probe_sentinel.py <name> <dialog_frames_dir> [normal_frames_dir]
+    Adds/replaces the signature in PROBE_SIGNATURES_FILE.
+    """
+    from config import PROBE_SIGNATURES_FILE, PROBE_POINTS, PROBE_MIN_MATCH
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if len(sys.argv) < 3:
+        logger.error("Usage: python probe_sentinel.py <name> <dialog_frames_dir> [normal_frames_dir]")
+        return
+
+    name = sys.argv[1]
+    positives = _load_frames(Path(sys.argv[2]))
+    negatives = _load_frames(Path(sys.argv[3])) if len(sys.argv) > 3 else []
+    signature = learn_signature(name, positives, negatives, count=PROBE_POINTS, min_match=PROBE_MIN_MATCH)
+
+    sentinel = ProbeSentinel.load(PROBE_SIGNATURES_FILE)
+    sentinel.signatures[name] = signature
+    sentinel.save(PROBE_SIGNATURES_FILE)
+
+    hits = sum(signature.matches_frame(f) for f in positives)
+    false_hits = sum(signature.matches_frame(f) for f in negatives)
+    logger.info(f"Learned '{name}' with {len(signature.points)} probes: "
+                f"{hits}/{len(positives)} dialog frames matched, "
+                f"{false_hits}/{len(negatives)} normal frames matched")
+
+
+if __name__ == "__main__":
+    main()
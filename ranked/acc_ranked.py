@@ -3,7 +3,6 @@ Refactored Ranked Mode Bot
 Uses centralized utilities for faster development and less code duplication
 """
 
-import pytesseract
 import time
 import keyboard
 import logging
@@ -14,11 +13,19 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import TESSERACT_PATH, BUTTONS_DIR, BUTTON_OFFSETS
+from config import (BUTTONS_DIR, BUTTON_OFFSETS,
+                    LAYOUT_BUTTONS, BUTTON_LAYOUT, LAYOUT_VERIFY_MARGIN,
+                    CAPTURE_BUFFER_SLOTS, PREFILTER_ENABLED,
+                    PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS, PREFILTER_MIN_RATIO,
+                    FRAME_CACHE_ENABLED, FRAME_CACHE_ENTRIES, FRAME_CACHE_MODE)
 from windows_manager import RobloxWindowManager
 from input_simulator import InputSimulator
 from button_detector import ButtonDetector, ButtonActions
-import pyautogui
+from screen_capture import ScreenCapture
+from color_prefilter import ColorPrefilter
+from frame_cache import FrameCache
+from button_layout import ButtonLayout
+from modal_ocr import find_text
 
 # Configure logging
 logging.basicConfig(
@@ -27,9 +34,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Setup Tesseract
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-
 # Global stop flag
 stop_flag = False
 
@@ -49,42 +53,113 @@ class RankedBot:
     def __init__(self):
         self.window_mgr = RobloxWindowManager()
         self.input = InputSimulator()
-        self.detector = ButtonDetector(BUTTONS_DIR)
+        self.capture = ScreenCapture(slots=CAPTURE_BUFFER_SLOTS)
+        layout = ButtonLayout(LAYOUT_BUTTONS, BUTTON_LAYOUT, verify_margin=LAYOUT_VERIFY_MARGIN)
+        self.frame_cache = FrameCache(FRAME_CACHE_ENTRIES, FRAME_CACHE_MODE, enabled=FRAME_CACHE_ENABLED)
+        self.detector = ButtonDetector(BUTTONS_DIR, layout=layout, capture=self.capture,
+                                       frame_cache=self.frame_cache)
         self.actions = ButtonActions(self.detector, self.input)
+        self.prefilter = ColorPrefilter(BUTTONS_DIR, PREFILTER_DOWNSAMPLE, PREFILTER_COLOR_BITS,
+                                        PREFILTER_MIN_RATIO, enabled=PREFILTER_ENABLED)
     
-    def dismiss_modal(self) -> bool:
-        """Find and dismiss any modal dialogs via OCR
+    def _grab_frame(self):
+        """Capture the Roblox window into a pooled buffer
         
         Returns:
-            True if dismissed, False otherwise
+            (frame, region) or (None, None) if unavailable
         """
         region = self.window_mgr.get_roblox_region()
         if not region:
-            logger.error("Cannot get region")
-            return False
+            return None, None
+        return self.capture.grab(region), region
+    
+    def dismiss_modal(self, frame=None, region=None, gray=None, key=None) -> bool:
+        """Find and dismiss any modal dialogs via OCR
         
-        screenshot = pyautogui.screenshot(region=region)
-        gray = screenshot.convert("L")
-        data = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+        Args:
+            frame: Optional BGRA frame of the Roblox window already captured this tick
+            region: Screen region the frame was captured from (required with frame)
+            gray: Grayscale version of frame (converted here when omitted)
+            key: Frame cache key of gray, hashed once per tick (hashed here when omitted)
         
-        for i, word in enumerate(data["text"]):
-            if "dismiss" in word.lower():
-                x = data["left"][i] + data["width"][i] // 2 + region[0]
-                y = data["top"][i] + data["height"][i] // 2 + region[1]
-                self.input.wiggle_and_click(x, y)
-                logger.info(f"Dismissed modal at ({x}, {y})")
-                return True
+        Returns:
+            True if dismissed, False otherwise
+        """
+        if frame is None:
+            frame, region = self._grab_frame()
+            if frame is None:
+                logger.error("Cannot capture Roblox window")
+                return False
         
-        return False
+        if gray is None:
+            gray = self.capture.gray(frame)
+        hit = find_text(gray, "dismiss", cache=self.frame_cache, key=key)
+        if not hit:
+            return False
+        
+        x = hit[0] + region[0]
+        y = hit[1] + region[1]
+        self.input.wiggle_and_click(x, y)
+        logger.info(f"Dismissed modal at ({x}, {y})")
+        return True
     
-    def click_button_safe(self, button_name: str) -> bool:
+    def click_button_safe(self, button_name: str, frame=None, region=None, gray=None, key=None) -> bool:
         """Safely click a button with error handling
         
+        The color prefilter narrows the search to an ROI of the frame and the
+        match runs on that same frame, so no extra capture is taken.
+        
+        Args:
+            button_name: Button name
+            frame: Optional BGRA frame of the Roblox window already captured this tick
+            region: Screen region the frame was captured from (required with frame)
+            gray: Grayscale version of frame (converted here when omitted)
+            key: Frame cache key of gray, hashed once per tick (hashed here when omitted)
+        
         Returns:
             True if clicked, False otherwise
         """
+        if frame is None:
+            frame, region = self._grab_frame()
+            if frame is None:
+                return False
+        
+        roi = self.prefilter.candidates(button_name, frame)
+        if not roi:
+            logger.debug(f"{button_name} rejected by color prefilter")
+            return False
+        
+        if gray is None:
+            gray = self.capture.gray(frame)
         offset = BUTTON_OFFSETS.get(button_name, (0, 0))
-        return self.actions.click_button(button_name, offset=offset)
+        return self.actions.click_button_in_frame(button_name, gray, region[:2], offset=offset, roi=roi,
+                                                  key=key)
+    
+    def tick(self) -> None:
+        """One pass of the main loop: dismiss popups, then the standard clicks
+        
+        One capture serves every check; a new one is taken only after a click,
+        since the screen changes under it.
+        """
+        frame, region = self._grab_frame()
+        if frame is None:
+            logger.error("Cannot capture Roblox window")
+            return
+        gray = self.capture.gray(frame)
+        key = self.frame_cache.key(gray)  # One hash serves every lookup on this frame
+        
+        # Dismiss any popups/modals
+        clicked = self.dismiss_modal(frame, region, gray, key)
+        
+        # Standard action clicks
+        for button_name in ("fight", "ranked", "refresh"):
+            if clicked:
+                frame, region = self._grab_frame()
+                if frame is None:
+                    return
+                gray = self.capture.gray(frame)
+                key = self.frame_cache.key(gray)
+            clicked = self.click_button_safe(button_name, frame, region, gray, key)
     
     def run_loop(self) -> None:
         """Main automation loop"""
@@ -100,19 +175,16 @@ class RankedBot:
                         time.sleep(5)
                         continue
                 
-                # Dismiss any popups/modals
-                self.dismiss_modal()
-                
-                # Standard action clicks
-                self.click_button_safe("fight")
-                self.click_button_safe("ranked")
-                self.click_button_safe("refresh")
+                self.tick()
                 
                 time.sleep(1)  # Main loop delay
                 
             except Exception as e:
                 logger.error(f"Error in main loop: {e}", exc_info=True)
                 time.sleep(2)
+        
+        self.prefilter.log_report()
+        self.frame_cache.log_report()
 
 
 def main():
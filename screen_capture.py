@@ -0,0 +1,655 @@
+"""
+Screen capture utility module
+Captures screen regions straight into reusable NumPy buffers
+Avoids a fresh PIL Image (and grayscale copy) on every tick
+"""
+
+import ctypes
+import sys
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from async_utils import run_blocking
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+FrameCallback = Callable[[np.ndarray, object], None]
+
+
+class FramePool:
+    """Ring of preallocated frame buffers, one ring per (kind, shape)
+
+    A buffer handed out by the pool stays valid until the ring wraps around,
+    so callers keep at most `slots - 1` older frames alive at once.
+    """
+
+    def __init__(self, slots: int = 3, max_shapes: int = 4):
+        """Initialize frame pool
+
+        Args:
+            slots: Buffers per ring (2 = double buffering)
+            max_shapes: Rings kept per kind; callers alternating between a few
+                region sizes reuse buffers instead of reallocating on every switch
+        """
+        self.slots = max(1, slots)
+        self.max_shapes = max(1, max_shapes)
+        self._rings: Dict[Tuple[str, tuple], list] = {}
+        self._next: Dict[Tuple[str, tuple], int] = {}
+        self.allocations = 0
+        self.reuses = 0
+
+    def next_buffer(self, kind: str, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """Get the next buffer of a ring, allocating only on first use
+
+        Args:
+            kind: Ring name (e.g. "bgra", "gray")
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Reused or newly allocated buffer (contents undefined)
+        """
+        key = (kind, tuple(shape))
+        ring = self._rings.pop(key, None)
+        if ring is None:
+            # New shape (first frame, resize, another region size): evict the
+            # least recently used rings of this kind beyond max_shapes
+            same_kind = [k for k in self._rings if k[0] == kind]
+            for stale in same_kind[:max(0, len(same_kind) - self.max_shapes + 1)]:
+                del self._rings[stale]
+                del self._next[stale]
+            ring = []
+            self._next[key] = 0
+        self._rings[key] = ring  # Re-insert: dict order doubles as LRU order
+
+        index = self._next[key]
+        self._next[key] = (index + 1) % self.slots
+        if index < len(ring):
+            self.reuses += 1
+            return ring[index]
+
+        buf = np.empty(shape, dtype=dtype)
+        ring.append(buf)
+        self.allocations += 1
+        logger.debug(f"Allocated {kind} buffer {shape} ({self.allocations} total)")
+        return buf
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes held by the pool"""
+        return sum(buf.nbytes for ring in self._rings.values() for buf in ring)
+
+    def clear(self) -> None:
+        """Release all buffers"""
+        self._rings.clear()
+        self._next.clear()
+
+
+class HeadlessCaptureBackend:
+    """Capture backend that serves frames from memory (replay, tests, Linux)"""
+
+    def __init__(self, source: Optional[Callable[[Region], np.ndarray]] = None,
+                 window_source: Optional[Callable[[int], np.ndarray]] = None,
+                 window_size: Tuple[int, int] = (1280, 720)):
+        """Initialize headless backend
+
+        Args:
+            source: Callable returning a BGRA or BGR frame for a screen region;
+                a black frame is produced when omitted
+            window_source: Callable returning the current frame of a window handle
+                (fake per-window capture); falls back to `source` over a
+                `window_size` region when omitted
+            window_size: (width, height) reported for windows without a window_source
+        """
+        self.source = source
+        self.window_source = window_source
+        self.default_window_size = window_size
+        self._pending: Optional[Tuple[int, Optional[np.ndarray]]] = None  # Frame read by window_size()
+
+    @staticmethod
+    def _write(frame: Optional[np.ndarray], out: np.ndarray) -> bool:
+        """Convert/copy a BGR(A) or gray frame into a BGRA buffer"""
+        if frame is None:
+            return False
+        if frame.shape[:2] != out.shape[:2]:
+            frame = cv2.resize(frame, (out.shape[1], out.shape[0]), interpolation=cv2.INTER_NEAREST)
+        if frame.ndim == 2:
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA, dst=out)
+        elif frame.shape[2] == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=out)
+        else:
+            np.copyto(out, frame)
+        return True
+
+    def grab_into(self, region: Region, out: np.ndarray) -> bool:
+        """Copy the source frame for a region into `out`
+
+        Args:
+            region: (left, top, width, height)
+            out: BGRA buffer of shape (height, width, 4)
+
+        Returns:
+            True if a frame was written
+        """
+        if self.source is None:
+            out.fill(0)
+            return True
+        return self._write(self.source(region), out)
+
+    def grab_points_into(self, points: Sequence[Tuple[int, int]], out: np.ndarray) -> bool:
+        """Copy single source pixels into `out`
+
+        Args:
+            points: [(x, y), ...] in screen coordinates
+            out: BGRA buffer of shape (1, len(points), 4)
+
+        Returns:
+            True if every pixel was written
+        """
+        if self.source is None:
+            out.fill(0)
+            return True
+        pixel = np.empty((1, 1, 4), dtype=np.uint8)
+        for i, (x, y) in enumerate(points):
+            if not self._write(self.source((int(x), int(y), 1, 1)), pixel):
+                return False
+            out[0, i] = pixel[0, 0]
+        return True
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        """(width, height) of a fake window
+
+        The frame read here is kept for the grab that follows, so a window
+        capture calls window_source once.
+        """
+        if self.window_source is None:
+            return self.default_window_size
+        frame = self.window_source(hwnd)
+        self._pending = (hwnd, frame)
+        return (0, 0) if frame is None else (frame.shape[1], frame.shape[0])
+
+    def screen_size(self) -> Tuple[int, int]:
+        """(width, height) of the fake screen: one default-sized window"""
+        return self.default_window_size
+
+    def _window_frame(self, hwnd: int) -> Optional[np.ndarray]:
+        """Frame fetched by the last window_size() for this window, else a fresh one"""
+        pending, self._pending = self._pending, None
+        if pending is not None and pending[0] == hwnd:
+            return pending[1]
+        return self.window_source(hwnd)
+
+    def grab_window_into(self, hwnd: int, out: np.ndarray) -> bool:
+        """Copy a fake window's current frame into `out`
+
+        Args:
+            hwnd: Window handle
+            out: BGRA buffer sized by window_size()
+
+        Returns:
+            True if a frame was written
+        """
+        if self.window_source is None:
+            return self.grab_into((0, 0, out.shape[1], out.shape[0]), out)
+        return self._write(self._window_frame(hwnd), out)
+
+    def grab_window_points_into(self, hwnd: int, points: Sequence[Tuple[int, int]],
+                                out: np.ndarray) -> bool:
+        """Copy single pixels of a fake window into `out`
+
+        Args:
+            hwnd: Window handle
+            points: [(x, y), ...] relative to the window's top-left
+            out: BGRA buffer of shape (1, len(points), 4)
+
+        Returns:
+            True if every pixel was written
+        """
+        if self.window_source is None:
+            return self.grab_points_into(points, out)
+        frame = self._window_frame(hwnd)
+        if frame is None:
+            return False
+        pixel = np.empty((1, 1, 4), dtype=np.uint8)
+        for i, (x, y) in enumerate(points):
+            if not self._write(frame[int(y):int(y) + 1, int(x):int(x) + 1], pixel):
+                return False
+            out[0, i] = pixel[0, 0]
+        return True
+
+
+class _BitmapInfoHeader(ctypes.Structure):
+    _fields_ = [
+        ("biSize", ctypes.c_uint32),
+        ("biWidth", ctypes.c_int32),
+        ("biHeight", ctypes.c_int32),
+        ("biPlanes", ctypes.c_uint16),
+        ("biBitCount", ctypes.c_uint16),
+        ("biCompression", ctypes.c_uint32),
+        ("biSizeImage", ctypes.c_uint32),
+        ("biXPelsPerMeter", ctypes.c_int32),
+        ("biYPelsPerMeter", ctypes.c_int32),
+        ("biClrUsed", ctypes.c_uint32),
+        ("biClrImportant", ctypes.c_uint32),
+    ]
+
+
+class _BitmapInfo(ctypes.Structure):
+    _fields_ = [("bmiHeader", _BitmapInfoHeader), ("bmiColors", ctypes.c_uint32 * 3)]
+
+
+class _DibSurface:
+    """Memory DC + bitmap that GDI draws into and GetDIBits reads back from"""
+
+    DIB_RGB_COLORS = 0
+
+    def __init__(self, gdi32):
+        self.gdi32 = gdi32
+        self.dc = None
+        self.bitmap = None
+        self.size = (0, 0)
+        self.info = _BitmapInfo()
+        self.info.bmiHeader.biSize = ctypes.sizeof(_BitmapInfoHeader)
+        self.info.bmiHeader.biPlanes = 1
+        self.info.bmiHeader.biBitCount = 32
+
+    def ensure(self, src_dc, width: int, height: int) -> None:
+        """Create (or reuse) the memory DC and bitmap for a capture size"""
+        if self.dc is not None and self.size == (width, height):
+            return
+        self.close()
+        self.dc = self.gdi32.CreateCompatibleDC(src_dc)
+        self.bitmap = self.gdi32.CreateCompatibleBitmap(src_dc, width, height)
+        self.gdi32.SelectObject(self.dc, self.bitmap)
+        self.size = (width, height)
+        self.info.bmiHeader.biWidth = width
+        self.info.bmiHeader.biHeight = -height  # Negative = top-down rows
+        logger.debug(f"Created GDI capture bitmap {width}x{height}")
+
+    def read(self, out: np.ndarray) -> bool:
+        """Copy the memory bitmap into `out` (BGRA, top-down)"""
+        rows = self.gdi32.GetDIBits(self.dc, self.bitmap, 0, self.size[1],
+                                    out.ctypes.data, ctypes.byref(self.info), self.DIB_RGB_COLORS)
+        return rows == self.size[1]
+
+    def close(self) -> None:
+        """Free the DC and bitmap"""
+        if self.bitmap:
+            self.gdi32.DeleteObject(self.bitmap)
+        if self.dc:
+            self.gdi32.DeleteDC(self.dc)
+        self.dc = None
+        self.bitmap = None
+        self.size = (0, 0)
+
+
+class GdiCaptureBackend:
+    """Windows desktop capture via BitBlt + GetDIBits straight into a NumPy buffer"""
+
+    SRCCOPY = 0x00CC0020
+    PW_RENDERFULLCONTENT = 0x00000002  # Include DirectX/DWM-composed content
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.gdi32 = ctypes.windll.gdi32
+        handle = ctypes.c_void_p
+        self.user32.GetDC.restype = handle
+        self.user32.GetDC.argtypes = [handle]
+        self.user32.ReleaseDC.argtypes = [handle, handle]
+        self.user32.GetWindowDC.restype = handle
+        self.user32.GetWindowDC.argtypes = [handle]
+        self.user32.PrintWindow.argtypes = [handle, handle, ctypes.c_uint]
+        self.gdi32.CreateCompatibleDC.restype = handle
+        self.gdi32.CreateCompatibleDC.argtypes = [handle]
+        self.gdi32.CreateCompatibleBitmap.restype = handle
+        self.gdi32.CreateCompatibleBitmap.argtypes = [handle, ctypes.c_int, ctypes.c_int]
+        self.gdi32.SelectObject.restype = handle
+        self.gdi32.SelectObject.argtypes = [handle, handle]
+        self.gdi32.DeleteObject.argtypes = [handle]
+        self.gdi32.DeleteDC.argtypes = [handle]
+        self.gdi32.BitBlt.argtypes = [handle, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                      handle, ctypes.c_int, ctypes.c_int, ctypes.c_uint32]
+        self.gdi32.GetDIBits.argtypes = [handle, handle, ctypes.c_uint, ctypes.c_uint,
+                                         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint]
+
+        self._frame = _DibSurface(self.gdi32)
+        self._points = _DibSurface(self.gdi32)  # Separate so probe reads don't resize the frame bitmap
+
+    def grab_into(self, region: Region, out: np.ndarray) -> bool:
+        """Capture a desktop region into `out`
+
+        Args:
+            region: (left, top, width, height) in screen coordinates
+            out: BGRA buffer of shape (height, width, 4)
+
+        Returns:
+            True if the full region was captured
+        """
+        left, top, width, height = region
+        screen_dc = self.user32.GetDC(None)
+        try:
+            self._frame.ensure(screen_dc, width, height)
+            if not self.gdi32.BitBlt(self._frame.dc, 0, 0, width, height,
+                                     screen_dc, left, top, self.SRCCOPY):
+                return False
+            return self._frame.read(out)
+        finally:
+            self.user32.ReleaseDC(None, screen_dc)
+
+    def grab_points_into(self, points: Sequence[Tuple[int, int]], out: np.ndarray) -> bool:
+        """Capture single desktop pixels into `out`
+
+        Each point is BitBlt'd 1x1 into its own column of an N x 1 bitmap,
+        which is read back with one GetDIBits.
+
+        Args:
+            points: [(x, y), ...] in screen coordinates
+            out: BGRA buffer of shape (1, len(points), 4)
+
+        Returns:
+            True if every pixel was captured
+        """
+        screen_dc = self.user32.GetDC(None)
+        try:
+            self._points.ensure(screen_dc, len(points), 1)
+            for i, (x, y) in enumerate(points):
+                if not self.gdi32.BitBlt(self._points.dc, i, 0, 1, 1,
+                                         screen_dc, int(x), int(y), self.SRCCOPY):
+                    return False
+            return self._points.read(out)
+        finally:
+            self.user32.ReleaseDC(None, screen_dc)
+
+    def screen_size(self) -> Tuple[int, int]:
+        """(width, height) of the primary screen"""
+        return (self.user32.GetSystemMetrics(0), self.user32.GetSystemMetrics(1))  # SM_CXSCREEN, SM_CYSCREEN
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        """(width, height) of a window's full rect"""
+        import win32gui
+        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        return (right - left, bottom - top)
+
+    def grab_window_into(self, hwnd: int, out: np.ndarray) -> bool:
+        """Capture a window's own pixels via PrintWindow, even when it's covered
+
+        Args:
+            hwnd: Window handle
+            out: BGRA buffer sized by window_size()
+
+        Returns:
+            True if the window was captured
+        """
+        height, width = out.shape[:2]
+        window_dc = self.user32.GetWindowDC(hwnd)
+        try:
+            self._frame.ensure(window_dc, width, height)
+            if not self.user32.PrintWindow(hwnd, self._frame.dc, self.PW_RENDERFULLCONTENT):
+                return False
+            return self._frame.read(out)
+        finally:
+            self.user32.ReleaseDC(hwnd, window_dc)
+
+    def grab_window_points_into(self, hwnd: int, points: Sequence[Tuple[int, int]],
+                                out: np.ndarray) -> bool:
+        """Read single pixels from a window's DC
+
+        Far cheaper than PrintWindow, but windows that present through DirectX
+        may not keep their content in the DC and read back black.
+
+        Args:
+            hwnd: Window handle
+            points: [(x, y), ...] relative to the window rect's top-left
+            out: BGRA buffer of shape (1, len(points), 4)
+
+        Returns:
+            True if every pixel was read
+        """
+        window_dc = self.user32.GetWindowDC(hwnd)
+        try:
+            self._points.ensure(window_dc, len(points), 1)
+            for i, (x, y) in enumerate(points):
+                if not self.gdi32.BitBlt(self._points.dc, i, 0, 1, 1,
+                                         window_dc, int(x), int(y), self.SRCCOPY):
+                    return False
+            return self._points.read(out)
+        finally:
+            self.user32.ReleaseDC(hwnd, window_dc)
+
+    def close(self) -> None:
+        """Free GDI objects"""
+        self._frame.close()
+        self._points.close()
+
+
+def default_backend():
+    """GDI capture on Windows, headless everywhere else"""
+    if sys.platform == "win32":
+        return GdiCaptureBackend()
+    logger.warning("No desktop capture on this platform, using headless backend")
+    return HeadlessCaptureBackend()
+
+
+class ScreenCapture:
+    """Captures regions into pooled BGRA buffers with in-place gray/downscale helpers"""
+
+    def __init__(self, backend=None, slots: int = 3):
+        """Initialize screen capture
+
+        Args:
+            backend: Capture backend (defaults to the platform backend)
+            slots: Buffers kept per ring; frames stay valid for `slots - 1` later grabs
+        """
+        self.backend = backend or default_backend()
+        self.pool = FramePool(slots)
+        self.frames_captured = 0
+        self._subscribers: List[FrameCallback] = []
+        self._subscribers_lock = threading.Lock()
+        self.lock = threading.Lock()  # Serialises pool use by the *_async variants
+
+    def subscribe(self, callback: FrameCallback) -> FrameCallback:
+        """Call `callback(frame, source)` for every frame this capture produces
+
+        Callbacks run on the capturing thread right after the grab, while the
+        pooled buffer is still current, so they should be quick. `source` is the
+        region for grab() and the window handle for grab_window().
+
+        Args:
+            callback: Frame callback
+
+        Returns:
+            The callback (pass it to unsubscribe)
+        """
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: FrameCallback) -> None:
+        """Stop delivering frames to a callback (no-op if not subscribed)"""
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _publish(self, frame: np.ndarray, source: object) -> None:
+        """Hand a fresh frame to every subscriber"""
+        self.frames_captured += 1
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(frame, source)
+            except Exception as e:
+                logger.error(f"Frame subscriber failed: {e}", exc_info=True)
+
+    def grab(self, region: Region) -> Optional[np.ndarray]:
+        """Capture a region into a pooled buffer
+
+        Args:
+            region: (left, top, width, height)
+
+        Returns:
+            BGRA array (height, width, 4) or None on failure
+        """
+        _, _, width, height = region
+        out = self.pool.next_buffer("bgra", (height, width, 4))
+        try:
+            if not self.backend.grab_into(region, out):
+                logger.debug(f"Capture of {region} failed")
+                return None
+        except Exception as e:
+            logger.error(f"Capture error for {region}: {e}")
+            return None
+        self._publish(out, region)
+        return out
+
+    def grab_window(self, hwnd: int) -> Optional[np.ndarray]:
+        """Capture a window's own pixels into a pooled buffer
+
+        Unlike grab(), this reads the window directly (PrintWindow on Windows),
+        so it works while the window is covered and needs no focus change.
+        Pixel (0, 0) is the window rect's top-left corner.
+
+        Args:
+            hwnd: Window handle
+
+        Returns:
+            BGRA array (height, width, 4) or None on failure
+        """
+        try:
+            width, height = self.backend.window_size(hwnd)
+            if width <= 0 or height <= 0:
+                return None
+            out = self.pool.next_buffer("bgra", (height, width, 4))
+            if not self.backend.grab_window_into(hwnd, out):
+                logger.debug(f"Window capture of {hwnd} failed")
+                return None
+        except Exception as e:
+            logger.error(f"Window capture error for {hwnd}: {e}")
+            return None
+        self._publish(out, hwnd)
+        return out
+
+    def grab_points(self, points: Sequence[Tuple[int, int]]) -> Optional[np.ndarray]:
+        """Capture single screen pixels into a pooled buffer
+
+        Much cheaper than grab() of their bounding box when the points are
+        spread over a window. Not published to subscribers.
+
+        Args:
+            points: [(x, y), ...] in screen coordinates
+
+        Returns:
+            BGRA array (len(points), 4) in point order, or None on failure
+        """
+        if not len(points):
+            return None
+        out = self.pool.next_buffer("points", (1, len(points), 4))
+        try:
+            if not self.backend.grab_points_into(points, out):
+                logger.debug(f"Capture of {len(points)} points failed")
+                return None
+        except Exception as e:
+            logger.error(f"Point capture error: {e}")
+            return None
+        return out[0]
+
+    def screen_size(self) -> Tuple[int, int]:
+        """(width, height) of the primary screen"""
+        return self.backend.screen_size()
+
+    def window_size(self, hwnd: int) -> Tuple[int, int]:
+        """(width, height) of a window's rect, or (0, 0) if it can't be read"""
+        try:
+            return self.backend.window_size(hwnd)
+        except Exception as e:
+            logger.error(f"Window size error for {hwnd}: {e}")
+            return (0, 0)
+
+    def grab_window_points(self, hwnd: int, points: Sequence[Tuple[int, int]]) -> Optional[np.ndarray]:
+        """Read single pixels of a window into a pooled buffer
+
+        Args:
+            hwnd: Window handle
+            points: [(x, y), ...] relative to the window rect's top-left
+
+        Returns:
+            BGRA array (len(points), 4) in point order, or None on failure
+        """
+        if not len(points):
+            return None
+        out = self.pool.next_buffer("points", (1, len(points), 4))
+        try:
+            if not self.backend.grab_window_points_into(hwnd, points, out):
+                logger.debug(f"Window point capture of {hwnd} failed")
+                return None
+        except Exception as e:
+            logger.error(f"Window point capture error for {hwnd}: {e}")
+            return None
+        return out[0]
+
+    def _locked_copy(self, func: Callable, *args) -> Optional[np.ndarray]:
+        """Run a grab holding the lock and return a private copy of the frame"""
+        with self.lock:
+            frame = func(*args)
+            return None if frame is None else frame.copy()
+
+    async def grab_async(self, region: Region) -> Optional[np.ndarray]:
+        """grab() on a worker thread (see async_utils)
+
+        Grabs on one capture are serialised. The frame is copied out of the
+        pool before the lock is released, since other tasks' grabs would
+        otherwise overwrite it; ButtonDetector.grab_and_match_async() avoids
+        the copy when only a match is needed.
+        """
+        return await run_blocking(self._locked_copy, self.grab, region)
+
+    async def grab_window_async(self, hwnd: int) -> Optional[np.ndarray]:
+        """grab_window() on a worker thread, returning a private copy (see grab_async)"""
+        return await run_blocking(self._locked_copy, self.grab_window, hwnd)
+
+    def gray(self, frame: np.ndarray) -> np.ndarray:
+        """Convert a BGRA frame to grayscale into a pooled buffer
+
+        Args:
+            frame: BGRA frame
+
+        Returns:
+            Grayscale array (height, width)
+        """
+        out = self.pool.next_buffer("gray", frame.shape[:2])
+        cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY, dst=out)
+        return out
+
+    def grab_gray(self, region: Region) -> Optional[np.ndarray]:
+        """Capture a region and return its grayscale buffer
+
+        Args:
+            region: (left, top, width, height)
+
+        Returns:
+            Grayscale array or None on failure
+        """
+        frame = self.grab(region)
+        if frame is None:
+            return None
+        return self.gray(frame)
+
+    @staticmethod
+    def downscaled(frame: np.ndarray, factor: int) -> np.ndarray:
+        """Strided downscale view (no copy)
+
+        Args:
+            frame: Any frame array
+            factor: Keep every Nth row and column
+
+        Returns:
+            View into `frame`
+        """
+        if factor <= 1:
+            return frame
+        return frame[::factor, ::factor]
@@ -63,6 +63,8 @@ def install_pip_packages():
         "pydirectinput",
         "pytesseract",
         "pillow",
+        "numpy",
+        "opencv-python",
         "psutil",
         "pywin32",
         "keyboard",
@@ -189,7 +191,9 @@ Button templates should use simple names without suffix:
 - Take screenshots at the same resolution you'll run the bot at
 - Ensure clean lighting and contrast
 - Buttons must be fully visible and unobstructed
+- Transparent pixels (PNG alpha) are ignored when matching; erase background around rounded buttons instead of cropping tighter
 - If detection fails, try lowering confidence threshold in config.py (0.7-0.8)
+- `python calibrate_thresholds.py <labelled_frames_dir> <output_json>` computes per-button thresholds from frames recorded in game; copied to `thresholds.json` here they take precedence over `IMAGE_CONFIDENCE`
 - If UI changes, regenerate the templates
 
 ## Testing Detection
@@ -219,6 +223,8 @@ def validate_installation():
         "pydirectinput",
         "pytesseract",
         "PIL",
+        "numpy",
+        "cv2",
         "psutil",
         "win32gui",
         "keyboard",
@@ -246,6 +252,8 @@ def validate_installation():
         "windows_manager.py",
         "input_simulator.py",
         "button_detector.py",
+        "screen_capture.py",
+        "template_matcher.py",
         "buttons/README_BUTTONS.md",
     ]
     
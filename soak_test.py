@@ -0,0 +1,477 @@
+"""
+Soak test harness
+Drives RankedBot, AFKMonitor or the unified runtime against the headless
+capture backend with replayed or synthetic frames for a simulated duration,
+sampling RSS, live objects, cache sizes and per-tick latency. Fails when any
+of them keeps growing past the SOAK_* bounds in config.py, or when the frame
+cache rarely hits although the replayed frames repeat within its size.
+
+Needs psutil, OpenCV and NumPy. The desktop-only modules the bots import
+(keyboard, pydirectinput, pyautogui, pywin32) are replaced by stand-ins, so
+it runs headless and never registers hotkeys or sends real input. OCR uses
+Tesseract when it's installed (TESSERACT_PATH); otherwise a stand-in that
+reads no text, so modal dismissal isn't exercised.
+"""
+
+import gc
+import importlib
+import logging
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import psutil
+
+from config import (PROJECT_ROOT, BUTTONS_DIR, SOAK_SAMPLE_INTERVAL, SOAK_WARMUP, SOAK_MAX_RSS_GROWTH_MB,
+                    SOAK_MAX_OBJECT_GROWTH, SOAK_MAX_CACHE_ENTRIES, SOAK_MAX_LATENCY_GROWTH,
+                    SOAK_MAX_TICK_LATENCY, SOAK_MIN_CACHE_HIT_RATE, TESSERACT_PATH)
+from frame_cache import FrameCache
+from screen_capture import HeadlessCaptureBackend
+from synthetic_scenes import SceneGenerator, load_scenes
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+# Input/window modules the bots import; the harness swaps out every object that
+# calls them, so stand-ins only keep the imports off the real desktop
+STUB_MODULES = ("keyboard", "pydirectinput", "pyautogui", "win32gui", "win32process", "win32con")
+
+
+class _StubModule(types.ModuleType):
+    """Stand-in module whose every attribute is a no-op callable"""
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+def tesseract_available() -> bool:
+    """True if pytesseract imports and can run the Tesseract binary"""
+    try:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def install_stubs(ocr: bool) -> None:
+    """Put stand-ins for desktop-only modules in sys.modules before the bots import them
+
+    Args:
+        ocr: Keep the real pytesseract; otherwise OCR reads no text
+    """
+    for name in STUB_MODULES:
+        sys.modules[name] = _StubModule(name)
+    if not ocr:
+        fake = _StubModule("pytesseract")
+        fake.pytesseract = types.SimpleNamespace(tesseract_cmd=None)
+        fake.Output = types.SimpleNamespace(DICT="dict")
+        fake.image_to_data = lambda *args, **kwargs: {key: [] for key in
+                                                      ("text", "left", "top", "width", "height", "conf")}
+        sys.modules["pytesseract"] = fake
+
+
+class FrameFeed:
+    """Cycles through recorded or synthetic frames as the fake game screen
+
+    The window sits at the screen origin, so screen regions crop the current
+    frame (anything outside it reads as black).
+    """
+
+    def __init__(self, frames: List[np.ndarray]):
+        if not frames:
+            raise ValueError("FrameFeed needs at least one frame")
+        self.frames = frames
+        self.index = 0
+
+    @classmethod
+    def from_folder(cls, folder: Path) -> "FrameFeed":
+        """Replay PNGs from a folder (e.g. one written by synthetic_scenes.py)"""
+        folder = Path(folder)
+        if (folder / "ground_truth.json").exists():
+            return cls([scene.frame for scene in load_scenes(folder)])
+        frames = []
+        for path in sorted(folder.glob("*.png")):
+            frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA))
+        return cls(frames)
+
+    @classmethod
+    def synthetic(cls, count: int = 50, seed: int = 0) -> "FrameFeed":
+        """Pre-render synthetic scenes (generated once, then cycled)"""
+        return cls([scene.frame for scene in SceneGenerator(BUTTONS_DIR, seed=seed).scenes(count)])
+
+    @property
+    def current(self) -> np.ndarray:
+        return self.frames[self.index]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the fake window"""
+        return (self.current.shape[1], self.current.shape[0])
+
+    def advance(self) -> None:
+        self.index = (self.index + 1) % len(self.frames)
+
+    def source(self, region: Region) -> np.ndarray:
+        """Screen-region source for HeadlessCaptureBackend"""
+        left, top, width, height = region
+        frame = self.current
+        out = np.zeros((height, width, 4), dtype=np.uint8)
+        crop = frame[max(0, top):top + height, max(0, left):left + width]
+        out[max(0, -top):max(0, -top) + crop.shape[0], max(0, -left):max(0, -left) + crop.shape[1]] = crop
+        return out
+
+    def window_source(self, hwnd: int) -> np.ndarray:
+        """Per-window source for HeadlessCaptureBackend"""
+        return self.current
+
+
+class FakeWindowManager:
+    """Stand-in for RobloxWindowManager: one window at the origin of the feed"""
+
+    hwnd = 1
+
+    def __init__(self, feed: FrameFeed):
+        self.feed = feed
+
+    def get_roblox_hwnds(self) -> List[int]:
+        return [self.hwnd]
+
+    def get_roblox_hwnd(self) -> Optional[int]:
+        return self.hwnd
+
+    def get_roblox_region(self, hwnd: Optional[int] = None) -> Optional[Region]:
+        return (0, 0) + self.feed.size
+
+    def is_roblox_running(self) -> bool:
+        return True
+
+    def focus_roblox(self, start_if_missing: bool = True) -> bool:
+        return True
+
+    def focus_window(self, hwnd: int) -> bool:
+        return True
+
+    def bring_to_front(self, hwnd: int) -> bool:
+        return True
+
+
+class FakeInput:
+    """Stand-in for InputSimulator that only counts actions"""
+
+    def __init__(self):
+        self.clicks = 0
+        self.keys = 0
+
+    def wiggle_and_click(self, x: int, y: int, clicks: int = 1) -> None:
+        self.clicks += 1
+
+    def press_key(self, key: str, duration: float = 0.1) -> None:
+        self.keys += 1
+
+    def drag(self, x1: int, y1: int, x2: int, y2: int, duration: float = 0.3) -> None:
+        self.clicks += 1
+
+
+@dataclass
+class SoakTarget:
+    """A bot wired to the fake screen"""
+    name: str
+    tick: Callable[[float], None]  # Called with simulated time
+    caches: Callable[[], Dict[str, int]]  # Tracked cache/dict sizes
+    interval: float  # Simulated seconds per tick
+    frame_cache: Optional[FrameCache] = None  # Hit rate is checked at the end
+
+
+def _import_script(folder: str, module: str):
+    """Import a bot script that lives in a subdirectory (not a package)"""
+    path = str(PROJECT_ROOT / folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+
+def _common_caches(detector, prefilter, capture) -> Dict[str, int]:
+    sizes = {
+        "detector.cache": len(detector.cache),
+        "detector.frame_cache": len(detector.frame_cache) if detector.frame_cache is not None else 0,
+        "detector.templates": len(detector.templates),
+        "prefilter.signatures": len(prefilter.signatures),
+        "prefilter.checks": len(prefilter.checks),
+        "capture.subscribers": len(capture._subscribers),
+        "capture.pool_allocations": capture.pool.allocations,
+    }
+    if detector.layout is not None:
+        sizes["layout.offsets"] = len(detector.layout.offsets)
+    return sizes
+
+
+def build_target(bot: str, feed: FrameFeed, input_sim: FakeInput) -> SoakTarget:
+    """Construct a bot and swap its window manager, capture backend and input for fakes
+
+    Desktop-only modules are stubbed first (see install_stubs).
+
+    Args:
+        bot: "ranked", "afk" or "runtime"
+        feed: Frame source
+        input_sim: Fake input executor
+
+    Returns:
+        SoakTarget
+    """
+    ocr = tesseract_available()
+    if not ocr:
+        logger.warning("Tesseract not found; OCR runs against a stand-in that reads no text")
+    install_stubs(ocr)
+    window_mgr = FakeWindowManager(feed)
+    backend = HeadlessCaptureBackend(source=feed.source, window_source=feed.window_source)
+
+    if bot == "ranked":
+        ranked = _import_script("ranked", "acc_ranked").RankedBot()
+        ranked.window_mgr = window_mgr
+        ranked.input = ranked.actions.input = input_sim
+        ranked.capture.backend = backend
+        return SoakTarget(bot, lambda now: ranked.tick(),
+                          lambda: _common_caches(ranked.detector, ranked.prefilter, ranked.capture), 1.0,
+                          ranked.frame_cache)
+
+    if bot == "afk":
+        monitor = _import_script("afk_reconnect", "afk_monitor").AFKMonitor()
+        monitor.window_mgr = window_mgr
+        monitor.input = monitor.actions.input = input_sim
+        monitor.capture.backend = backend
+        monitor.sentinel.capture.backend = backend
+
+        def afk_tick(now: float) -> None:
+            if monitor.sentinel:
+                monitor.sentinel.check_window(window_mgr.hwnd)
+            monitor.check_once()
+
+        def afk_caches() -> Dict[str, int]:
+            sizes = _common_caches(monitor.detector, monitor.prefilter, monitor.capture)
+            sizes["sentinel.hits"] = len(monitor.sentinel.hits)
+            return sizes
+        return SoakTarget(bot, afk_tick, afk_caches, 2.0, monitor.frame_cache)
+
+    if bot == "runtime":
+        from behaviours import build_behaviours
+        from bot_runtime import BotRuntime
+        from screen_capture import ScreenCapture
+
+        runtime = BotRuntime(build_behaviours(["ranked", "afk"]), window_mgr=window_mgr,
+                             capture=ScreenCapture(backend), input_sim=input_sim)
+
+        def runtime_caches() -> Dict[str, int]:
+            sizes = _common_caches(runtime.detector, runtime.prefilter, runtime.capture)
+            sizes["runtime.latencies"] = max(len(s.latencies) for s in runtime.states)
+            return sizes
+        # Behaviours are scheduled on time.monotonic(); map simulated time onto it
+        base = time.monotonic()
+        return SoakTarget(bot, lambda now: runtime.tick(base + now), runtime_caches,
+                          min(s.behaviour.interval for s in runtime.states), runtime.frame_cache)
+
+    raise ValueError(f"Unknown bot: {bot} (choose ranked, afk or runtime)")
+
+
+@dataclass
+class SoakSample:
+    """Resource snapshot at one simulated time"""
+    sim_time: float
+    rss_mb: float
+    objects: int
+    caches: Dict[str, int]
+    latency_p50: float  # Over the ticks since the previous sample
+    latency_p95: float
+
+
+@dataclass
+class SoakResult:
+    samples: List[SoakSample] = field(default_factory=list)
+    ticks: int = 0
+    errors: int = 0
+    cache: Dict[str, float] = field(default_factory=dict)  # FrameCache.report() at the end of the run
+    failures: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+
+def run_soak(target: SoakTarget, feed: FrameFeed, duration: float,
+             sample_interval: float = SOAK_SAMPLE_INTERVAL) -> SoakResult:
+    """Tick a target for `duration` simulated seconds and sample resources
+
+    Args:
+        target: Bot under test
+        feed: Frame source (advanced once per tick)
+        duration: Simulated seconds to run
+        sample_interval: Simulated seconds between samples
+
+    Returns:
+        SoakResult with samples (bounds are checked by check_bounds)
+    """
+    process = psutil.Process()
+    result = SoakResult()
+    latencies: List[float] = []
+    next_sample = 0.0
+    sim_time = 0.0
+
+    while sim_time <= duration:
+        started = time.perf_counter()
+        try:
+            target.tick(sim_time)
+        except Exception as e:
+            result.errors += 1
+            if result.errors == 1:
+                logger.error(f"Tick failed: {e}", exc_info=True)
+        latencies.append(time.perf_counter() - started)
+        result.ticks += 1
+        feed.advance()
+
+        if sim_time >= next_sample:
+            gc.collect()
+            result.samples.append(SoakSample(
+                sim_time,
+                process.memory_info().rss / 2 ** 20,
+                len(gc.get_objects()),
+                target.caches(),
+                float(np.percentile(latencies, 50)),
+                float(np.percentile(latencies, 95)),
+            ))
+            latencies.clear()
+            next_sample += sample_interval
+        sim_time += target.interval
+
+    if target.frame_cache is not None and target.frame_cache.enabled:
+        result.cache = target.frame_cache.report()
+    return result
+
+
+def check_bounds(result: SoakResult, warmup: float = SOAK_WARMUP,
+                 max_rss_growth_mb: float = SOAK_MAX_RSS_GROWTH_MB,
+                 max_object_growth: float = SOAK_MAX_OBJECT_GROWTH,
+                 max_cache_entries: int = SOAK_MAX_CACHE_ENTRIES,
+                 max_latency_growth: float = SOAK_MAX_LATENCY_GROWTH,
+                 max_tick_latency: float = SOAK_MAX_TICK_LATENCY,
+                 min_cache_hit_rate: float = SOAK_MIN_CACHE_HIT_RATE) -> List[str]:
+    """Compare post-warmup samples against growth bounds
+
+    Args:
+        min_cache_hit_rate: Required frame cache hit rate (0 skips the check,
+            e.g. when the replayed frames don't fit in the cache)
+
+    Returns:
+        Failure descriptions (empty when the run is within bounds)
+    """
+    samples = result.samples
+    if len(samples) < 3:
+        return ["Too few samples; run longer or sample more often"]
+
+    steady = samples[min(len(samples) - 2, max(1, int(len(samples) * warmup))):]
+    first, last = steady[0], steady[-1]
+    failures = []
+
+    rss_growth = last.rss_mb - first.rss_mb
+    if rss_growth > max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB after warmup (limit {max_rss_growth_mb} MB)")
+
+    object_growth = (last.objects - first.objects) / max(1, first.objects)
+    if object_growth > max_object_growth:
+        failures.append(f"Live objects grew {object_growth:.1%} after warmup "
+                        f"({first.objects} -> {last.objects}, limit {max_object_growth:.0%})")
+
+    for name, size in last.caches.items():
+        if name == "capture.pool_allocations":
+            # Buffers are reused once every shape has been seen
+            if size > first.caches.get(name, 0):
+                failures.append(f"Frame pool kept allocating after warmup "
+                                f"({first.caches.get(name, 0)} -> {size})")
+        elif size > max_cache_entries:
+            failures.append(f"{name} holds {size} entries (limit {max_cache_entries})")
+
+    # Theil-Sen trend of the per-sample median: the median of all pairwise slopes,
+    # so a handful of noisy samples (GC, scheduler hiccups) can't fake growth
+    times = np.array([s.sim_time for s in steady])
+    medians = np.array([s.latency_p50 for s in steady])
+    i, j = np.triu_indices(len(steady), 1)
+    slope = float(np.median((medians[j] - medians[i]) / (times[j] - times[i])))
+    start = float(np.median(medians - slope * (times - times[0])))
+    end = start + slope * (times[-1] - times[0])
+    if start > 0 and end > start * max_latency_growth and end - start > 0.005:
+        failures.append(f"Tick latency trend grew {start * 1000:.1f}ms -> {end * 1000:.1f}ms "
+                        f"(limit x{max_latency_growth})")
+
+    p95 = float(np.median([s.latency_p95 for s in steady]))
+    if p95 > max_tick_latency:
+        failures.append(f"Tick latency p95 {p95 * 1000:.0f}ms over the {max_tick_latency * 1000:.0f}ms ceiling")
+
+    if result.cache and result.cache["hit_rate"] < min_cache_hit_rate:
+        failures.append(f"Frame cache hit rate {result.cache['hit_rate']:.1%} under {min_cache_hit_rate:.0%} "
+                        f"({result.cache['hits']} hits / {result.cache['misses']} misses, "
+                        f"{result.cache['evictions']} evictions)")
+
+    if result.errors:
+        failures.append(f"{result.errors}/{result.ticks} ticks raised")
+    return failures
+
+
+def main() -> None:
+    """Soak a bot against the headless backend
+
+    Usage: python soak_test.py <ranked|afk|runtime> [simulated_seconds] [frames_dir]
+    Exits with status 1 when a bound is exceeded.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) < 2:
+        logger.error("Usage: python soak_test.py <ranked|afk|runtime> [simulated_seconds] [frames_dir]")
+        sys.exit(2)
+
+    bot = sys.argv[1]
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3600.0
+    feed = FrameFeed.from_folder(Path(sys.argv[3])) if len(sys.argv) > 3 else FrameFeed.synthetic()
+    input_sim = FakeInput()
+    target = build_target(bot, feed, input_sim)
+
+    logger.info(f"Soaking {bot} for {duration:.0f} simulated seconds over {len(feed.frames)} frames")
+    started = time.perf_counter()
+    result = run_soak(target, feed, duration)
+    min_hit_rate = SOAK_MIN_CACHE_HIT_RATE
+    if target.frame_cache is not None and len(feed.frames) > target.frame_cache.max_entries:
+        # Every frame is evicted before the feed comes back round to it
+        logger.warning(f"{len(feed.frames)} frames don't fit in the frame cache "
+                       f"({target.frame_cache.max_entries} entries); hit rate not checked")
+        min_hit_rate = 0.0
+    result.failures = check_bounds(result, min_cache_hit_rate=min_hit_rate)
+
+    for sample in result.samples:
+        caches = ", ".join(f"{k}={v}" for k, v in sample.caches.items())
+        logger.info(f"t={sample.sim_time:>7.0f}s rss={sample.rss_mb:.1f}MB objects={sample.objects} "
+                    f"tick_p50={sample.latency_p50 * 1000:.1f}ms tick_p95={sample.latency_p95 * 1000:.1f}ms "
+                    f"{caches}")
+    logger.info(f"{result.ticks} ticks, {input_sim.clicks} clicks, {result.errors} errors "
+                f"in {time.perf_counter() - started:.0f}s wall time")
+    if result.cache:
+        logger.info(f"Frame cache: {result.cache['hits']} hits / {result.cache['misses']} misses "
+                    f"({result.cache['hit_rate']:.1%}), {result.cache['evictions']} evictions")
+
+    if result.passed:
+        logger.info("Soak passed")
+        return
+    for failure in result.failures:
+        logger.error(f"Soak failed: {failure}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Multi-window supervisor
+Drives several Roblox clients from one process: every matching window is
+captured in the background and checked on a shared worker pool, while all
+input goes through a single focus/input lock
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (BUTTONS_DIR, CAPTURE_BUFFER_SLOTS, SUPERVISOR_WORKERS, SUPERVISOR_INTERVAL,
+                    SUPERVISOR_REFRESH_INTERVAL, SUPERVISOR_REPORT_INTERVAL)
+from screen_capture import ScreenCapture
+from windows_manager import RobloxWindowManager
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+
+@dataclass
+class WindowState:
+    """Scheduling state and timing stats for one client window"""
+    hwnd: int
+    capture: ScreenCapture
+    next_due: float = 0.0
+    busy: bool = False
+    ticks: int = 0
+    errors: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=256))  # Capture + handler time
+    delays: deque = field(default_factory=lambda: deque(maxlen=256))  # Due -> started
+
+
+class WindowContext:
+    """What a handler sees for one tick of one window"""
+
+    def __init__(self, supervisor: "WindowSupervisor", hwnd: int, frame: np.ndarray, region: Region):
+        self.supervisor = supervisor
+        self.hwnd = hwnd
+        self.frame = frame
+        self.region = region
+
+    def send_input(self, action: Callable[[], None]) -> bool:
+        """Run an input action with this window focused, serialised with all other windows
+
+        `region` is refreshed after focusing, so the action should read it when
+        called rather than when built.
+
+        Args:
+            action: Callable sending clicks/keys in screen coordinates
+
+        Returns:
+            True if the action ran (skipped if the window was resized since capture)
+        """
+        def run(region: Region) -> None:
+            self.region = region
+            action()
+        return self.supervisor.send_input(self.hwnd, run, (self.frame.shape[1], self.frame.shape[0]))
+
+
+Handler = Callable[[WindowContext], None]
+
+
+class WindowSupervisor:
+    """Schedules capture + detection for every Roblox window on a shared pool"""
+
+    def __init__(self, handler: Handler, workers: int = SUPERVISOR_WORKERS,
+                 interval: float = SUPERVISOR_INTERVAL,
+                 refresh_interval: float = SUPERVISOR_REFRESH_INTERVAL,
+                 window_mgr: Optional[RobloxWindowManager] = None,
+                 capture_factory: Callable[[], ScreenCapture] = None):
+        """Initialize supervisor
+
+        Args:
+            handler: Called with a WindowContext per window tick (runs on a worker)
+            workers: Worker threads shared by all windows
+            interval: Target seconds between ticks of the same window
+            refresh_interval: Seconds between window list refreshes
+            window_mgr: Window manager (lookup, region, bring to front)
+            capture_factory: Builds one ScreenCapture per window (buffers aren't shared across threads)
+        """
+        self.handler = handler
+        self.workers = workers
+        self.interval = interval
+        self.refresh_interval = refresh_interval
+        self.window_mgr = window_mgr or RobloxWindowManager()
+        self.capture_factory = capture_factory or (lambda: ScreenCapture(slots=CAPTURE_BUFFER_SLOTS))
+        self.windows: Dict[int, WindowState] = {}
+        self.input_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._wake = threading.Event()  # Set when a worker frees a window
+        self.input_waits: deque = deque(maxlen=256)
+
+    def refresh_windows(self) -> None:
+        """Track newly opened windows and drop closed ones"""
+        current = set(self.window_mgr.get_roblox_hwnds())
+        with self._state_lock:
+            for hwnd in list(self.windows):
+                if hwnd not in current and not self.windows[hwnd].busy:
+                    logger.info(f"Window {hwnd} closed")
+                    del self.windows[hwnd]
+            for hwnd in current - set(self.windows):
+                logger.info(f"Tracking window {hwnd}")
+                self.windows[hwnd] = WindowState(hwnd, self.capture_factory(), next_due=time.monotonic())
+
+    def send_input(self, hwnd: int, action: Callable[[Region], None],
+                   frame_size: Optional[Tuple[int, int]] = None) -> bool:
+        """Bring a window forward and run an input action under the global input lock
+
+        The window isn't maximized (that would move everything the frame was
+        matched on); its rect is re-read after focusing and handed to the action.
+
+        Args:
+            hwnd: Window that should receive the input
+            action: Callable taking the window's current region and sending clicks/keys
+            frame_size: (width, height) of the frame the input was planned on; the
+                action is skipped if the window no longer has that size
+
+        Returns:
+            True if the action ran
+        """
+        requested = time.monotonic()
+        with self.input_lock:
+            self.input_waits.append(time.monotonic() - requested)
+            self.window_mgr.bring_to_front(hwnd)
+            region = self.window_mgr.get_roblox_region(hwnd)
+            if not region:
+                return False
+            if frame_size and tuple(region[2:]) != tuple(frame_size):
+                logger.warning(f"Window {hwnd} resized to {region[2]}x{region[3]} since capture, skipping input")
+                return False
+            action(region)
+            return True
+
+    def _tick(self, state: WindowState, due: float) -> None:
+        """Capture one window and run the handler on it (worker thread)"""
+        started = time.monotonic()
+        try:
+            frame = state.capture.grab_window(state.hwnd)
+            region = self.window_mgr.get_roblox_region(state.hwnd) if frame is not None else None
+            if region:
+                self.handler(WindowContext(self, state.hwnd, frame, region))
+        except Exception as e:
+            state.errors += 1
+            logger.error(f"Window {state.hwnd} tick failed: {e}", exc_info=True)
+        finally:
+            finished = time.monotonic()
+            with self._state_lock:
+                state.delays.append(started - due)
+                state.latencies.append(finished - started)
+                state.ticks += 1
+                state.next_due = max(due + self.interval, finished)
+                state.busy = False
+            self._wake.set()
+
+    def _due_windows(self, now: float) -> List[WindowState]:
+        """Idle windows whose tick is due, most overdue first"""
+        with self._state_lock:
+            due = [w for w in self.windows.values() if not w.busy and w.next_due <= now]
+            due.sort(key=lambda w: w.next_due)
+            for state in due:
+                state.busy = True
+        return due
+
+    def run(self, should_stop: Callable[[], bool], report_interval: float = SUPERVISOR_REPORT_INTERVAL) -> None:
+        """Schedule ticks until `should_stop()` returns True
+
+        Args:
+            should_stop: Polled between scheduling passes
+            report_interval: Seconds between fairness/latency reports
+        """
+        logger.info(f"Supervisor running with {self.workers} workers, {self.interval}s per window")
+        last_refresh = 0.0
+        last_report = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="window") as pool:
+            while not should_stop():
+                now = time.monotonic()
+                if now - last_refresh >= self.refresh_interval:
+                    self.refresh_windows()
+                    last_refresh = now
+                if now - last_report >= report_interval:
+                    self.log_report()
+                    last_report = now
+
+                for state in self._due_windows(now):
+                    pool.submit(self._tick, state, state.next_due)
+
+                # Sleep until the next window is due or a worker finishes
+                # (bounded so stop stays responsive)
+                self._wake.clear()
+                with self._state_lock:
+                    pending = [w.next_due for w in self.windows.values() if not w.busy]
+                wake = min(pending, default=now + 0.1)
+                self._wake.wait(min(0.1, max(0.0, wake - time.monotonic())))
+
+        self.log_report()
+        logger.info("Supervisor stopped")
+
+    def report(self) -> Dict[str, object]:
+        """Per-window latency/delay percentiles plus fairness across windows
+
+        Returns:
+            {"windows": {hwnd: stats}, "fairness": Jain's index of tick counts,
+             "input_wait_p95": seconds}
+        """
+        with self._state_lock:
+            windows = {}
+            for hwnd, state in self.windows.items():
+                latencies = np.array(state.latencies) if state.latencies else np.zeros(1)
+                delays = np.array(state.delays) if state.delays else np.zeros(1)
+                windows[hwnd] = {
+                    "ticks": state.ticks,
+                    "errors": state.errors,
+                    "latency_p50": float(np.percentile(latencies, 50)),
+                    "latency_p95": float(np.percentile(latencies, 95)),
+                    "delay_p95": float(np.percentile(delays, 95)),
+                }
+            ticks = np.array([w.ticks for w in self.windows.values()], dtype=np.float64)
+        fairness = float(ticks.sum() ** 2 / (len(ticks) * (ticks ** 2).sum())) if ticks.any() else 1.0
+        waits = np.array(self.input_waits) if self.input_waits else np.zeros(1)
+        return {"windows": windows, "fairness": fairness,
+                "input_wait_p95": float(np.percentile(waits, 95))}
+
+    def log_report(self) -> None:
+        """Log per-window latency and cross-window fairness"""
+        report = self.report()
+        for hwnd, stats in report["windows"].items():
+            logger.info(f"Window {hwnd}: {stats['ticks']} ticks, latency p50 "
+                        f"{stats['latency_p50'] * 1000:.0f}ms / p95 {stats['latency_p95'] * 1000:.0f}ms, "
+                        f"schedule delay p95 {stats['delay_p95'] * 1000:.0f}ms, {stats['errors']} errors")
+        logger.info(f"Fairness {report['fairness']:.3f}, input lock wait p95 "
+                    f"{report['input_wait_p95'] * 1000:.0f}ms")
+
+
+def main() -> None:
+    """Run reconnect watching across every open Roblox client"""
+    import keyboard
+    from button_detector import ButtonDetector
+    from input_simulator import InputSimulator
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+    )
+
+    stop = threading.Event()
+    keyboard.add_hotkey('ctrl+shift+p', stop.set)
+    logger.info("Press Ctrl+Shift+P to stop the supervisor.")
+
+    detector = ButtonDetector(BUTTONS_DIR)
+    detector.get_template("reconnect")  # Load before workers race for it
+    input_sim = InputSimulator()
+
+    def reconnect_handler(ctx: WindowContext) -> None:
+        hit = detector.match_frame("reconnect", ctx.frame)
+        if hit:
+            (x, y), _ = hit
+            logger.info(f"Reconnect visible in window {ctx.hwnd}")
+            ctx.send_input(lambda: input_sim.wiggle_and_click(ctx.region[0] + x, ctx.region[1] + y))
+
+    WindowSupervisor(reconnect_handler).run(stop.is_set)
+
+
+if __name__ == "__main__":
+    main()
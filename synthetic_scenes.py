@@ -0,0 +1,289 @@
+"""
+Synthetic scene generator
+Composites the button templates from buttons/ onto varied backgrounds (random
+position and scale, noise, blur, partial occlusion, rendered "Dismiss" modals)
+with ground truth, so detectors can be tested and benchmarked offline on Linux
+"""
+
+import json
+import logging
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]
+
+
+@dataclass
+class SceneObject:
+    """One composited button"""
+    name: str
+    box: Region  # (left, top, width, height) in frame coordinates
+    scale: float
+    occluded: float = 0.0  # Fraction of the box covered by an occluder
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return (self.box[0] + self.box[2] // 2, self.box[1] + self.box[3] // 2)
+
+
+@dataclass
+class Scene:
+    """A generated BGRA frame and what's in it"""
+    frame: np.ndarray
+    objects: List[SceneObject] = field(default_factory=list)
+    modal_box: Optional[Region] = None  # Modal panel
+    dismiss_box: Optional[Region] = None  # "Dismiss" word inside the modal
+
+    def ground_truth(self) -> dict:
+        """JSON-serialisable ground truth"""
+        return {
+            "size": [self.frame.shape[1], self.frame.shape[0]],
+            "objects": [{"name": o.name, "box": list(o.box), "scale": round(o.scale, 3),
+                         "occluded": round(o.occluded, 3)} for o in self.objects],
+            "modal_box": list(self.modal_box) if self.modal_box else None,
+            "dismiss_box": list(self.dismiss_box) if self.dismiss_box else None,
+        }
+
+
+def _overlaps(box: Region, others: Sequence[Region], margin: int = 8) -> bool:
+    left, top, width, height = box
+    for o_left, o_top, o_width, o_height in others:
+        if (left < o_left + o_width + margin and o_left < left + width + margin and
+                top < o_top + o_height + margin and o_top < top + height + margin):
+            return True
+    return False
+
+
+def paste(frame: np.ndarray, image: np.ndarray, left: int, top: int) -> None:
+    """Alpha-blend a BGR(A) image onto a BGRA frame in place"""
+    height, width = image.shape[:2]
+    target = frame[top:top + height, left:left + width, :3]
+    if image.shape[2] == 4:
+        alpha = image[..., 3:4].astype(np.float32) / 255.0
+        target[:] = (image[..., :3] * alpha + target * (1.0 - alpha)).astype(np.uint8)
+    else:
+        target[:] = image
+
+
+class SceneGenerator:
+    """Generates randomised scenes from the button templates"""
+
+    def __init__(self, buttons_dir: Path, size: Tuple[int, int] = (1280, 720), seed: Optional[int] = None,
+                 names: Optional[Sequence[str]] = None, max_buttons: int = 3,
+                 scale_range: Tuple[float, float] = (0.9, 1.1), noise_sigma: float = 6.0,
+                 blur_prob: float = 0.3, occlusion_prob: float = 0.2, max_occlusion: float = 0.3,
+                 modal_prob: float = 0.25):
+        """Initialize generator
+
+        Args:
+            buttons_dir: Directory of button PNG templates
+            size: Frame (width, height)
+            seed: RNG seed for reproducible scenes
+            names: Templates to use (default: every PNG in buttons_dir)
+            max_buttons: Most buttons placed per scene (0..max_buttons)
+            scale_range: Min/max template scale
+            noise_sigma: Max std-dev of gaussian pixel noise
+            blur_prob: Chance of a light blur over the whole frame
+            occlusion_prob: Chance each button is partly covered
+            max_occlusion: Largest covered fraction of a button
+            modal_prob: Chance of a rendered "Dismiss" modal
+        """
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.max_buttons = max_buttons
+        self.scale_range = scale_range
+        self.noise_sigma = noise_sigma
+        self.blur_prob = blur_prob
+        self.occlusion_prob = occlusion_prob
+        self.max_occlusion = max_occlusion
+        self.modal_prob = modal_prob
+
+        self.templates = {}
+        paths = sorted(Path(buttons_dir).glob("*.png"))
+        for path in paths:
+            if names is not None and path.stem not in names:
+                continue
+            image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+            if image is not None and image.ndim == 3:
+                self.templates[path.stem] = image
+        if not self.templates:
+            logger.warning(f"No button templates found in {buttons_dir}")
+
+    def _background(self) -> np.ndarray:
+        """Gradient, noise or block-colored game-like backdrop"""
+        width, height = self.size
+        frame = np.empty((height, width, 4), dtype=np.uint8)
+        frame[..., 3] = 255
+        kind = self.rng.integers(3)
+        if kind == 0:
+            start, end = self.rng.integers(0, 256, (2, 3))
+            ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+            frame[..., :3] = (start + (end - start) * ramp).astype(np.uint8)
+        elif kind == 1:
+            small = self.rng.integers(0, 256, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+            frame[..., :3] = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+        else:
+            frame[..., :3] = self.rng.integers(0, 256, 3)
+            for _ in range(self.rng.integers(5, 20)):
+                x, y = int(self.rng.integers(0, width)), int(self.rng.integers(0, height))
+                w, h = int(self.rng.integers(20, width // 3)), int(self.rng.integers(20, height // 3))
+                color = tuple(int(c) for c in self.rng.integers(0, 256, 3)) + (255,)
+                cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        return frame
+
+    def _place(self, width: int, height: int, taken: List[Region], tries: int = 30) -> Optional[Region]:
+        """Random non-overlapping box inside the frame"""
+        frame_w, frame_h = self.size
+        if width >= frame_w or height >= frame_h:
+            return None
+        for _ in range(tries):
+            box = (int(self.rng.integers(0, frame_w - width)), int(self.rng.integers(0, frame_h - height)),
+                   width, height)
+            if not _overlaps(box, taken):
+                return box
+        return None
+
+    def _occlude(self, frame: np.ndarray, box: Region) -> float:
+        """Cover a strip along one side of a box; returns the covered fraction"""
+        left, top, width, height = box
+        fraction = float(self.rng.uniform(0.1, self.max_occlusion))
+        color = tuple(int(c) for c in self.rng.integers(0, 256, 3)) + (255,)
+        side = self.rng.integers(4)
+        if side == 0:
+            cv2.rectangle(frame, (left, top), (left + int(width * fraction), top + height), color, -1)
+        elif side == 1:
+            cv2.rectangle(frame, (left + width - int(width * fraction), top), (left + width, top + height), color, -1)
+        elif side == 2:
+            cv2.rectangle(frame, (left, top), (left + width, top + int(height * fraction)), color, -1)
+        else:
+            cv2.rectangle(frame, (left, top + height - int(height * fraction)), (left + width, top + height), color, -1)
+        return fraction
+
+    def _modal(self, frame: np.ndarray, taken: List[Region]) -> Tuple[Optional[Region], Optional[Region]]:
+        """Render a dark modal panel with a "Dismiss" button label"""
+        width = int(self.rng.integers(320, 480))
+        height = int(self.rng.integers(160, 240))
+        box = self._place(width, height, taken)
+        if box is None:
+            return None, None
+        left, top = box[:2]
+        panel = tuple(int(c) for c in self.rng.integers(20, 60, 3)) + (255,)
+        cv2.rectangle(frame, (left, top), (left + width, top + height), panel, -1)
+        cv2.rectangle(frame, (left, top), (left + width, top + height), (200, 200, 200, 255), 2)
+        cv2.putText(frame, "Disconnected", (left + 20, top + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                    (235, 235, 235, 255), 2, cv2.LINE_AA)
+
+        scale = float(self.rng.uniform(0.7, 1.0))
+        (text_w, text_h), baseline = cv2.getTextSize("Dismiss", cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+        button_w, button_h = text_w + 40, text_h + baseline + 24
+        bx = left + (width - button_w) // 2
+        by = top + height - button_h - 20
+        cv2.rectangle(frame, (bx, by), (bx + button_w, by + button_h), (220, 220, 220, 255), -1)
+        tx, ty = bx + 20, by + 12 + text_h
+        cv2.putText(frame, "Dismiss", (tx, ty), cv2.FONT_HERSHEY_SIMPLEX, scale, (30, 30, 30, 255), 2,
+                    cv2.LINE_AA)
+        return box, (tx, ty - text_h, text_w, text_h + baseline)
+
+    def generate(self) -> Scene:
+        """Build one scene"""
+        frame = self._background()
+        scene = Scene(frame)
+        taken: List[Region] = []
+
+        if self.rng.random() < self.modal_prob:
+            scene.modal_box, scene.dismiss_box = self._modal(frame, taken)
+            if scene.modal_box:
+                taken.append(scene.modal_box)
+
+        names = list(self.templates)
+        count = int(self.rng.integers(0, self.max_buttons + 1)) if names else 0
+        for name in self.rng.permutation(names)[:count]:
+            image = self.templates[name]
+            scale = float(self.rng.uniform(*self.scale_range))
+            if abs(scale - 1.0) > 1e-3:
+                image = cv2.resize(image, None, fx=scale, fy=scale,
+                                   interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+            box = self._place(image.shape[1], image.shape[0], taken)
+            if box is None:
+                continue
+            paste(frame, image, box[0], box[1])
+            taken.append(box)
+            occluded = self._occlude(frame, box) if self.rng.random() < self.occlusion_prob else 0.0
+            scene.objects.append(SceneObject(str(name), box, scale, occluded))
+
+        if self.rng.random() < self.blur_prob:
+            cv2.GaussianBlur(frame, (3, 3), 0, dst=frame)
+        sigma = float(self.rng.uniform(0, self.noise_sigma))
+        if sigma > 0:
+            noise = self.rng.normal(0, sigma, frame.shape[:2] + (3,))
+            frame[..., :3] = np.clip(frame[..., :3] + noise, 0, 255).astype(np.uint8)
+        return scene
+
+    def scenes(self, count: int) -> Iterator[Scene]:
+        """Yield `count` scenes"""
+        for _ in range(count):
+            yield self.generate()
+
+
+def save_scenes(scenes: Iterator[Scene], out_dir: Path) -> int:
+    """Write scenes as PNGs plus a ground_truth.json index
+
+    Returns:
+        Number of scenes written
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    truth = {}
+    for index, scene in enumerate(scenes):
+        name = f"scene_{index:05d}.png"
+        cv2.imwrite(str(out_dir / name), scene.frame)
+        truth[name] = scene.ground_truth()
+    (out_dir / "ground_truth.json").write_text(json.dumps(truth, indent=1))
+    return len(truth)
+
+
+def load_scenes(folder: Path) -> List[Scene]:
+    """Read scenes written by save_scenes"""
+    folder = Path(folder)
+    truth = json.loads((folder / "ground_truth.json").read_text())
+    scenes = []
+    for name, data in sorted(truth.items()):
+        frame = cv2.imread(str(folder / name), cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            continue
+        if frame.shape[2] == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        objects = [SceneObject(o["name"], tuple(o["box"]), o["scale"], o["occluded"]) for o in data["objects"]]
+        scenes.append(Scene(frame, objects,
+                            tuple(data["modal_box"]) if data["modal_box"] else None,
+                            tuple(data["dismiss_box"]) if data["dismiss_box"] else None))
+    return scenes
+
+
+def main() -> None:
+    """Write synthetic scenes to disk
+
+    Usage: python synthetic_scenes.py <out_dir> [count] [seed]
+    """
+    from config import BUTTONS_DIR
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if len(sys.argv) < 2:
+        logger.error("Usage: python synthetic_scenes.py <out_dir> [count] [seed]")
+        return
+
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    written = save_scenes(SceneGenerator(BUTTONS_DIR, seed=seed).scenes(count), Path(sys.argv[1]))
+    logger.info(f"Wrote {written} scenes to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Masked coarse-to-fine template matching
+Templates honour their PNG alpha channel (or, opt-in, an auto-generated
+foreground mask) so game background inside the crop doesn't drag scores down.
+A coarse NCC on frame and template downscaled by the stride proposes
+candidates; each is confirmed with a full-resolution NCC on a small patch.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Template:
+    """Grayscale template with optional foreground mask and downscaled copies for the coarse pass"""
+
+    def __init__(self, name: str, gray: np.ndarray, mask: Optional[np.ndarray] = None):
+        """Build template
+
+        Args:
+            name: Template name
+            gray: Grayscale template (uint8)
+            mask: Foreground mask (nonzero = use pixel) or None for all pixels
+        """
+        self.name = name
+        self.gray = _as_uint8(gray)
+        self.height, self.width = gray.shape
+        self.mask = mask
+        self._coarse: Dict[int, Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height)"""
+        return (self.width, self.height)
+
+    @classmethod
+    def load(cls, path: Path, auto_mask: bool = False) -> Optional["Template"]:
+        """Load a PNG template, using its alpha channel as mask if present
+
+        Args:
+            path: PNG path
+            auto_mask: Generate a foreground mask when the PNG has no alpha. Off by
+                default: on crops without real transparency it costs recall under
+                scale jitter
+
+        Returns:
+            Template or None if the file can't be read
+        """
+        image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return None
+
+        mask = None
+        if image.ndim == 2:
+            gray = image
+        elif image.shape[2] == 4:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+            alpha = image[..., 3]
+            if alpha.min() < 255:
+                mask = np.where(alpha >= 128, 255, 0).astype(np.uint8)
+        else:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        if mask is None and auto_mask:
+            mask = foreground_mask(gray)
+        return cls(Path(path).stem, gray, mask)
+
+    def coarse(self, factor: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Template and mask downscaled by `factor` (cached per factor)"""
+        if factor not in self._coarse:
+            size = (max(1, round(self.width / factor)), max(1, round(self.height / factor)))
+            gray = cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA)
+            mask = None
+            if self.mask is not None:
+                mask = cv2.resize(self.mask, size, interpolation=cv2.INTER_NEAREST)
+            self._coarse[factor] = (gray, mask)
+        return self._coarse[factor]
+
+
+def _as_uint8(image: np.ndarray) -> np.ndarray:
+    """uint8 view of a grayscale image (matchTemplate needs matching depths)"""
+    if image.dtype == np.uint8:
+        return image
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def foreground_mask(gray: np.ndarray, threshold: int = 18, min_fill: float = 0.2) -> Optional[np.ndarray]:
+    """Estimate a foreground mask for a template without alpha
+
+    Pixels close to the crop's border color are treated as background.
+
+    Args:
+        gray: Grayscale template
+        threshold: Gray-level distance from the border color counted as foreground
+        min_fill: Below this foreground share the mask is considered unreliable
+
+    Returns:
+        uint8 mask (255 = foreground) or None to use every pixel
+    """
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    background = float(np.median(border))
+    mask = (np.abs(gray.astype(np.int16) - int(background)) > threshold).astype(np.uint8) * 255
+    mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+    fill = np.count_nonzero(mask) / mask.size
+    if fill < min_fill or fill > 0.97:
+        return None
+    return mask
+
+
+def ncc(image: np.ndarray, templ: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Zero-mean NCC map of a template over an image, masked when a mask is given
+
+    Returns:
+        Score map (NaN/inf from flat regions become 0, values clipped to [-1, 1])
+    """
+    if mask is not None:
+        result = cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED, mask=mask)
+    else:
+        result = cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+    np.nan_to_num(result, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.clip(result, -1.0, 1.0, out=result)
+
+
+def masked_ncc(patch: np.ndarray, template: Template) -> np.ndarray:
+    """Full-resolution (masked) NCC of a template over a patch at least as large as it"""
+    return ncc(_as_uint8(patch), template.gray, template.mask)
+
+
+def coarse_scores(frame: np.ndarray, template: Template, stride: int = 3) -> np.ndarray:
+    """NCC of the template over the frame, both downscaled by `stride`
+
+    Cell (row, col) approximates the full-resolution location (row * stride, col * stride).
+
+    Args:
+        frame: Grayscale frame (uint8)
+        template: Template to score
+        stride: Downscale factor
+
+    Returns:
+        Score map (empty if the downscaled frame is smaller than the template)
+    """
+    templ, mask = template.coarse(stride)
+    small = cv2.resize(frame, (frame.shape[1] // stride, frame.shape[0] // stride),
+                       interpolation=cv2.INTER_AREA)
+    if small.shape[0] < templ.shape[0] or small.shape[1] < templ.shape[1]:
+        return np.zeros((0, 0), dtype=np.float32)
+    return ncc(small, templ, mask)
+
+
+def _candidates(frame: np.ndarray, template: Template, stride: int, limit: int,
+                floor: float) -> List[Tuple[Tuple[int, int], float]]:
+    """Candidate top-left corners with their full-resolution scores, best first
+
+    Coarse peaks are confirmed with the full NCC over a (template + 4 * stride)
+    patch; search areas only a few strides larger than the template (layout
+    verify patches, prefilter ROIs) get one full NCC instead.
+    """
+    frame = _as_uint8(frame)
+    out_h = frame.shape[0] - template.height + 1
+    out_w = frame.shape[1] - template.width + 1
+    if out_h <= 0 or out_w <= 0:
+        return []
+
+    if stride <= 1 or min(out_h, out_w) <= 4 * stride:
+        scores = masked_ncc(frame, template)
+        radius = max(1, min(template.width, template.height) // 2)
+        return [((col, row), float(scores[row, col]))
+                for row, col in local_peaks(scores, radius, floor, limit)]
+
+    coarse = coarse_scores(frame, template, stride)
+    radius = max(1, min(template.width, template.height) // (2 * stride))
+    margin = 2 * stride
+    found = []
+    for row, col in local_peaks(coarse, radius, floor, limit):
+        top = max(0, row * stride - margin)
+        left = max(0, col * stride - margin)
+        patch = frame[top:top + template.height + 2 * margin, left:left + template.width + 2 * margin]
+        if patch.shape[0] < template.height or patch.shape[1] < template.width:
+            continue
+        _, score, _, (x, y) = cv2.minMaxLoc(masked_ncc(patch, template))
+        found.append(((left + x, top + y), float(score)))
+    found.sort(key=lambda item: item[1], reverse=True)
+    return found
+
+
+def local_peaks(scores: np.ndarray, radius: int, floor: float, limit: int) -> List[Tuple[int, int]]:
+    """Local maxima of a score map, best first
+
+    Args:
+        scores: Score map
+        radius: Neighbourhood radius (cells) a peak must dominate
+        floor: Minimum score
+        limit: Maximum peaks returned
+
+    Returns:
+        [(row, col), ...]
+    """
+    if scores.size == 0:
+        return []
+    size = 2 * radius + 1
+    dilated = cv2.dilate(scores, np.ones((size, size), np.uint8))
+    rows, cols = np.nonzero((scores >= dilated) & (scores >= floor))
+    order = np.argsort(scores[rows, cols])[::-1][:limit]
+    return list(zip(rows[order].tolist(), cols[order].tolist()))
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.3) -> np.ndarray:
+    """Greedy non-maximum suppression
+
+    Args:
+        boxes: (N, 4) boxes as (left, top, width, height)
+        scores: (N,) scores
+        iou_threshold: Boxes overlapping a better one by more than this are dropped
+
+    Returns:
+        Indices of kept boxes, best first
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.intp)
+    x1, y1 = boxes[:, 0].astype(np.float32), boxes[:, 1].astype(np.float32)
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[best] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def match(frame: np.ndarray, template: Template, confidence: float, stride: int = 3,
+          candidates: int = 8) -> Optional[Tuple[Tuple[int, int], float]]:
+    """Locate a template in a grayscale frame
+
+    A coarse NCC on copies downscaled by `stride` proposes candidates; each is
+    confirmed with the full-resolution (masked) NCC over a small patch.
+
+    Args:
+        frame: Grayscale frame
+        template: Template to find
+        confidence: Minimum confirmed score
+        stride: Coarse downscale factor (1 = single full-resolution NCC)
+        candidates: Coarse peaks confirmed at full resolution
+
+    Returns:
+        ((x, y) center in frame coordinates, score) or None
+    """
+    found = _candidates(frame, template, stride, candidates, -1.0)
+    if not found or found[0][1] < confidence:
+        return None
+    (left, top), score = found[0]
+    return (int(left + template.width // 2), int(top + template.height // 2)), score
+
+
+def match_all(frame: np.ndarray, template: Template, confidence: float, stride: int = 3,
+              max_candidates: int = 32, coarse_floor: float = 0.3,
+              iou_threshold: float = 0.3) -> List[Tuple[Tuple[int, int, int, int], float]]:
+    """Locate every occurrence of a template in a grayscale frame
+
+    Local maxima of the coarse map are confirmed at full resolution; confirmed
+    boxes are deduplicated with non-maximum suppression.
+
+    Args:
+        frame: Grayscale frame
+        template: Template to find
+        confidence: Minimum confirmed score
+        stride: Coarse downscale factor (1 = single full-resolution NCC)
+        max_candidates: Coarse peaks confirmed with the full NCC
+        coarse_floor: Minimum coarse score for a peak to be confirmed
+        iou_threshold: Overlap above which the weaker of two boxes is dropped
+
+    Returns:
+        [((left, top, width, height), score), ...] in frame coordinates, best first
+    """
+    found = [(corner, score) for corner, score
+             in _candidates(frame, template, stride, max_candidates, coarse_floor)
+             if score >= confidence]
+    if not found:
+        return []
+    boxes = np.asarray([(left, top, template.width, template.height) for (left, top), _ in found],
+                       dtype=np.int32)
+    scores = np.asarray([score for _, score in found], dtype=np.float32)
+    return [(tuple(int(v) for v in boxes[i]), float(scores[i]))
+            for i in nms(boxes, scores, iou_threshold)]
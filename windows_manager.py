@@ -11,14 +11,49 @@ import win32con
 import time
 import subprocess
 import logging
-from typing import Optional, Tuple
+from typing import Callable, List, Optional, Tuple
+
+from config import (FOCUS_DELAY, ROBLOX_STARTUP_WAIT, READY_POLL_INTERVAL, READY_POLL_BACKOFF,
+                    READY_POLL_MAX_INTERVAL, READY_STABLE_POLLS, BLANK_FRAME_RANGE, BACKGROUND_CAPTURE)
+from screen_capture import ScreenCapture
+from async_utils import run_blocking, run_input
 
 logger = logging.getLogger(__name__)
 
+_ready_capture: Optional[ScreenCapture] = None
+
+
+def poll_until(condition: Callable[[], bool], timeout: float,
+               interval: float = READY_POLL_INTERVAL, backoff: float = READY_POLL_BACKOFF,
+               max_interval: float = READY_POLL_MAX_INTERVAL) -> bool:
+    """Poll a condition until it holds or the deadline passes
+    
+    Args:
+        condition: Callable returning True when done
+        timeout: Deadline in seconds
+        interval: First sleep between polls
+        backoff: Interval multiplier after each miss
+        max_interval: Cap on the sleep between polls
+        
+    Returns:
+        True if the condition held before the deadline
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if condition():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
 
 class RobloxWindowManager:
     """Handles all Roblox window operations"""
     
+    last_time_to_ready: Optional[float] = None  # Seconds the last wait_for_ready took
+    
     @staticmethod
     def get_roblox_pids() -> set:
         """Find all Roblox process IDs"""
@@ -33,20 +68,19 @@ class RobloxWindowManager:
         return pids
     
     @staticmethod
-    def get_roblox_hwnd() -> Optional[int]:
-        """Get window handle for Roblox application
+    def get_roblox_hwnds() -> List[int]:
+        """Get window handles of every visible Roblox client window
         
         Returns:
-            Window handle (hwnd) or None if not found
+            List of hwnds in enumeration order (empty if none)
         """
         target_pids = RobloxWindowManager.get_roblox_pids()
         if not target_pids:
             logger.warning("No Roblox process found")
-            return None
+            return []
         
-        hwnd_match = None
+        matches = []
         def enum_handler(hwnd, _):
-            nonlocal hwnd_match
             if not win32gui.IsWindowVisible(hwnd):
                 return
             title = win32gui.GetWindowText(hwnd)
@@ -55,23 +89,37 @@ class RobloxWindowManager:
             try:
                 _, pid = win32process.GetWindowThreadProcessId(hwnd)
                 if pid in target_pids:
-                    hwnd_match = hwnd
+                    matches.append(hwnd)
             except Exception:
                 pass
         
         win32gui.EnumWindows(enum_handler, None)
+        return matches
+    
+    @staticmethod
+    def get_roblox_hwnd() -> Optional[int]:
+        """Get window handle for Roblox application
+        
+        Returns:
+            Window handle (hwnd) or None if not found
+        """
+        matches = RobloxWindowManager.get_roblox_hwnds()
+        hwnd_match = matches[-1] if matches else None
         if hwnd_match:
             logger.debug(f"Found Roblox window: {hwnd_match}")
         return hwnd_match
     
     @staticmethod
-    def get_roblox_region() -> Optional[Tuple[int, int, int, int]]:
+    def get_roblox_region(hwnd: Optional[int] = None) -> Optional[Tuple[int, int, int, int]]:
         """Get the window region (left, top, width, height) of Roblox window
         
+        Args:
+            hwnd: Window handle if already known (skips the process lookup)
+        
         Returns:
             (left, top, width, height) or None if window not found
         """
-        hwnd = RobloxWindowManager.get_roblox_hwnd()
+        hwnd = hwnd or RobloxWindowManager.get_roblox_hwnd()
         if not hwnd:
             logger.error("Cannot get region: Roblox window not found")
             return None
@@ -81,6 +129,87 @@ class RobloxWindowManager:
         logger.debug(f"Roblox region: {region}")
         return region
     
+    @staticmethod
+    def is_rendering(region: Tuple[int, int, int, int], hwnd: Optional[int] = None) -> bool:
+        """Check that a window shows a non-blank frame
+        
+        With BACKGROUND_CAPTURE the window's own pixels are read (PrintWindow),
+        so a covered or off-screen window isn't judged by what's on top of it.
+        
+        Args:
+            region: (left, top, width, height)
+            hwnd: Window handle; enables the background capture
+            
+        Returns:
+            True if the sampled pixels aren't a single flat color
+        """
+        global _ready_capture
+        if _ready_capture is None:
+            _ready_capture = ScreenCapture(slots=1)
+        if BACKGROUND_CAPTURE and hwnd:
+            frame = _ready_capture.grab_window(hwnd)
+        else:
+            frame = _ready_capture.grab(region)
+        if frame is None:
+            return False
+        sample = ScreenCapture.downscaled(frame, 16)[..., :3]
+        return int(sample.max()) - int(sample.min()) >= BLANK_FRAME_RANGE
+    
+    @staticmethod
+    def wait_for_ready(timeout: float = ROBLOX_STARTUP_WAIT,
+                       interval: float = READY_POLL_INTERVAL,
+                       backoff: float = READY_POLL_BACKOFF,
+                       max_interval: float = READY_POLL_MAX_INTERVAL,
+                       stable_polls: int = READY_STABLE_POLLS) -> Optional[int]:
+        """Wait until the Roblox window exists, has a settled rect and renders
+        
+        Returns as soon as all three hold instead of sleeping a fixed time.
+        
+        Args:
+            timeout: Deadline in seconds
+            interval: First sleep between polls
+            backoff: Interval multiplier after each miss
+            max_interval: Cap on the sleep between polls
+            stable_polls: Consecutive identical rects required
+            
+        Returns:
+            Window handle or None if the deadline passed
+        """
+        start = time.monotonic()
+        state = {"hwnd": None, "rect": None, "stable": 0}
+        
+        def ready() -> bool:
+            hwnd = RobloxWindowManager.get_roblox_hwnd()
+            if not hwnd:
+                state["stable"] = 0
+                return False
+            try:
+                rect = win32gui.GetWindowRect(hwnd)
+            except Exception:
+                state["stable"] = 0
+                return False
+            left, top, right, bottom = rect
+            if right - left <= 0 or bottom - top <= 0:
+                state["stable"] = 0
+                return False
+            
+            if hwnd == state["hwnd"] and rect == state["rect"]:
+                state["stable"] += 1
+            else:
+                state.update(hwnd=hwnd, rect=rect, stable=1)
+            if state["stable"] < stable_polls:
+                return False
+            return RobloxWindowManager.is_rendering((left, top, right - left, bottom - top), hwnd)
+        
+        if not poll_until(ready, timeout, interval, backoff, max_interval):
+            logger.error(f"Roblox not ready after {timeout:.1f}s")
+            return None
+        
+        elapsed = time.monotonic() - start
+        RobloxWindowManager.last_time_to_ready = elapsed
+        logger.info(f"Roblox window ready in {elapsed:.2f}s")
+        return state["hwnd"]
+    
     @staticmethod
     def focus_roblox(start_if_missing: bool = True) -> bool:
         """Focus and maximize the Roblox window
@@ -98,8 +227,7 @@ class RobloxWindowManager:
                 logger.info("Roblox not found. Attempting to start...")
                 try:
                     subprocess.Popen(["RobloxPlayerBeta.exe"])
-                    time.sleep(5)
-                    hwnd = RobloxWindowManager.get_roblox_hwnd()
+                    hwnd = RobloxWindowManager.wait_for_ready()
                     if not hwnd:
                         logger.error("Failed to find Roblox after starting")
                         return False
@@ -110,17 +238,74 @@ class RobloxWindowManager:
                 logger.error("Roblox window not found")
                 return False
         
+        return RobloxWindowManager.focus_window(hwnd)
+    
+    @staticmethod
+    def focus_window(hwnd: int) -> bool:
+        """Maximize a specific window and bring it to the foreground
+        
+        Args:
+            hwnd: Window handle
+            
+        Returns:
+            True if successfully focused, False otherwise
+        """
         try:
             win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
-            time.sleep(0.05)
+            poll_until(lambda: bool(win32gui.IsZoomed(hwnd)), FOCUS_DELAY)
             win32gui.SetForegroundWindow(hwnd)
-            time.sleep(0.05)
+            if not poll_until(lambda: win32gui.GetForegroundWindow() == hwnd, FOCUS_DELAY):
+                logger.debug("Roblox not foreground yet, continuing")
             logger.info("Roblox window focused and maximized")
             return True
         except Exception as e:
             logger.error(f"Failed to focus Roblox: {e}")
             return False
     
+    @staticmethod
+    def bring_to_front(hwnd: int) -> bool:
+        """Bring a window to the foreground without resizing it
+        
+        Unlike focus_window() this doesn't maximize, so coordinates taken from a
+        frame captured just before stay valid. Minimized windows are restored.
+        
+        Args:
+            hwnd: Window handle
+            
+        Returns:
+            True if the window was brought forward, False otherwise
+        """
+        try:
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            win32gui.SetForegroundWindow(hwnd)
+            if not poll_until(lambda: win32gui.GetForegroundWindow() == hwnd, FOCUS_DELAY):
+                logger.debug("Roblox not foreground yet, continuing")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to bring Roblox to front: {e}")
+            return False
+    
+    @staticmethod
+    async def get_roblox_hwnds_async() -> List[int]:
+        """get_roblox_hwnds() without blocking the event loop"""
+        return await run_blocking(RobloxWindowManager.get_roblox_hwnds)
+    
+    @staticmethod
+    async def get_roblox_hwnd_async() -> Optional[int]:
+        """get_roblox_hwnd() without blocking the event loop"""
+        return await run_blocking(RobloxWindowManager.get_roblox_hwnd)
+    
+    @staticmethod
+    async def get_roblox_region_async(hwnd: Optional[int] = None) -> Optional[Tuple[int, int, int, int]]:
+        """get_roblox_region() without blocking the event loop"""
+        return await run_blocking(RobloxWindowManager.get_roblox_region, hwnd)
+    
+    @staticmethod
+    async def focus_window_async(hwnd: int) -> bool:
+        """focus_window() on the input thread, so it can't interleave with clicks"""
+        return await run_input(RobloxWindowManager.focus_window, hwnd)
+    
     @staticmethod
     def is_roblox_running() -> bool:
         """Check if Roblox is running"""